@@ -45,7 +45,7 @@ const App = {
   async loadDay(date) {
     try {
       const r = await fetch(`data/entries/${date}.json?_=${Date.now()}`);
-      const entries = r.ok ? await r.json() : [];
+      const entries = r.ok ? (await r.json()).map(e => this.expandEntry(e)) : [];
       this.cache[date] = entries;
       return entries;
     } catch {
@@ -292,7 +292,8 @@ const App = {
         if (a.type === 'gif' || a.type === 'image') {
           if (skipGif) return;
           const url = this.giphyDirect(a.url);
-          card += '<img src="' + this.esc(url) + '" alt="' + this.esc(a.title || '') + '" class="gif-embed" loading="lazy">';
+          const dims = a.width && a.height ? ' width="' + (+a.width) + '" height="' + (+a.height) + '"' : '';
+          card += '<img src="' + this.esc(url) + '" alt="' + this.esc(a.title || '') + '"' + dims + ' class="gif-embed" loading="lazy">';
         } else if (a.type === 'pdf') {
           card += '<a href="' + this.esc(a.url) + '" class="attachment-link" target="_blank" rel="noopener noreferrer">📄 ' + this.esc(a.title || 'PDF') + '</a>';
         }
@@ -318,6 +319,14 @@ const App = {
 
   // ── Helpers ──
 
+  // Day files may be stored compact (defaults left out) or with short keys
+  SHORT_KEYS: { i: 'id', t: 'ts', y: 'type', c: 'content', m: 'mood', l: 'links', a: 'attachments', r: 'replyTo', g: 'tags' },
+  expandEntry(raw) {
+    const e = {};
+    for (const k in raw) e[this.SHORT_KEYS[k] || k] = raw[k];
+    return Object.assign({ type: 'post', mood: null, links: [], attachments: [], replyTo: null, tags: [] }, e);
+  },
+
   /**
    * Sets element content from trusted, pre-escaped HTML strings.
    * All user-supplied data is escaped via esc() before being included.
@@ -340,8 +349,17 @@ const App = {
     return m ? 'https://media.giphy.com/media/' + m[1] + '/giphy.gif' : url;
   },
 
+  // Day files and times follow the timezone in config.json, not the viewer's
+  zoneOpts(opts) {
+    const tz = this.config && this.config.timezone;
+    if (tz) {
+      try { new Intl.DateTimeFormat('en-US', { timeZone: tz }); return Object.assign({ timeZone: tz }, opts); } catch (e) {}
+    }
+    return opts;
+  },
+
   formatTime(ts) {
-    return new Date(ts).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit', hour12: false });
+    return new Date(ts).toLocaleTimeString('en-US', this.zoneOpts({ hour: '2-digit', minute: '2-digit', hour12: false }));
   },
 
   longDate(ds) {
@@ -369,8 +387,7 @@ const App = {
   },
 
   today() {
-    const n = new Date();
-    return n.getFullYear() + '-' + String(n.getMonth() + 1).padStart(2, '0') + '-' + String(n.getDate()).padStart(2, '0');
+    return new Intl.DateTimeFormat('en-CA', this.zoneOpts({ year: 'numeric', month: '2-digit', day: '2-digit' })).format(new Date());
   },
 
   moodEmoji(mood) {
@@ -0,0 +1,133 @@
+"""Content-addressed attachment store for whatsup.
+
+Attachments live in assets/ under the SHA-256 of their bytes, so attaching
+the same file twice stores it once: the second time costs one hash pass and
+a single existence check. New files are reflinked into place where the
+filesystem supports it and copied in-kernel otherwise.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+ASSETS_DIR = "assets"
+CHUNK_SIZE = 1 << 20
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+_STORED_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+class TooLarge(ValueError):
+    """Raised by store_chunks() when the data exceeds max_bytes."""
+
+
+def hash_file(path):
+    """Stream path through SHA-256. Returns (hexdigest, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def asset_url(sha256, ext):
+    """Repo-relative URL of a stored asset, e.g. assets/<sha256>.pdf."""
+    return f"{ASSETS_DIR}/{sha256}{ext.lower()}"
+
+
+def _clone(src, dst):
+    """Reflink src to dst if the filesystem allows it, else copy."""
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return
+    except OSError:
+        pass
+    shutil.copyfile(src, dst)
+
+
+def store_file(path, root="."):
+    """Add path to the store under root and return its attachment fields.
+
+    The result has url, sha256 and size; callers add type and title.
+    """
+    sha256, size = hash_file(path)
+    url = asset_url(sha256, Path(path).suffix)
+    dest = Path(root) / url
+    if not dest.exists():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.tmp")
+        try:
+            _clone(path, tmp)
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+    return {"url": url, "sha256": sha256, "size": size}
+
+
+def store_chunks(chunks, ext, root=".", max_bytes=None):
+    """Write an iterable of byte chunks into the store under root.
+
+    Data is hashed while it is spooled to a temp file next to its final
+    location, then renamed into place (or dropped if the asset already
+    exists), so nothing is held in memory or read twice.
+    """
+    assets = Path(root) / ASSETS_DIR
+    assets.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=assets, prefix=".upload-", suffix=".tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise TooLarge(f"file exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        sha256 = digest.hexdigest()
+        url = asset_url(sha256, ext)
+        dest = Path(root) / url
+        if dest.exists():
+            os.unlink(tmp)
+        else:
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return {"url": url, "sha256": sha256, "size": size}
+
+
+def stored_fields(path, root="."):
+    """Attachment fields for a file that is already in the store, else None.
+
+    Store files are named by their hash, so they need no second pass.
+    """
+    p = Path(path)
+    if not _STORED_NAME.match(p.name):
+        return None
+    try:
+        if p.resolve().parent != (Path(root) / ASSETS_DIR).resolve():
+            return None
+        size = p.stat().st_size
+    except OSError:
+        return None
+    return {"url": asset_url(p.stem, p.suffix), "sha256": p.stem, "size": size}
+
+
+def is_asset_url(url, root="."):
+    """True if url names an existing file in the store (e.g. from an upload)."""
+    return (url.startswith(ASSETS_DIR + "/")
+            and stored_fields(Path(root) / url, root) is not None)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Long-running whatsup daemon and its thin client.
+
+`./whatsup --daemon` keeps one Timeline (manifest, entry-ID index and
+recent days) in memory and serves the CLI commands over a Unix socket in
+the repo's .git directory. Writes are serialized on the shared Timeline
+and persist through the normal files; git commits and pushes
+happen afterwards on a background thread, so a write returns as soon as
+its files are on disk.
+
+The protocol is one JSON object per line. A request is
+{"op": "run", "command": ..., "opts": {...}}; the reply is a stream of
+{"out": text} / {"err": text} frames ending in {"status": n}. The GUIs
+read the day files themselves, so running commands is all it serves.
+
+`./whatsup`, gui.py and webgui.py go through run() / run_cli(), which
+use the daemon when one answers on the socket and otherwise run the
+command directly, exactly as before.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+import gitsync
+import timeline
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SOCKET_NAME = "whatsup.sock"
+CLIENT_TIMEOUT = 60.0     # seconds; posts may wait on unfurling and mirroring
+FRAME_BYTES = 1 << 16     # output buffered per frame before it is sent
+
+# whatsup flags, for clients that start from an argument list (the GUIs)
+_COMMAND_FLAGS = {"--list": "list", "--stats": "stats", "--rebucket": "rebucket", "--undo": "undo",
+                 "--feeds": "feeds", "--publish-status": "publish_status"}
+_ID_FLAGS = {"--edit": "edit", "--delete": "delete", "--history": "history"}
+_VALUE_FLAGS = {"--mood": "mood", "--gif": "gif", "--pdf": "pdf", "--image": "image",
+                "--file-name": "file_name", "--link": "link", "--reply": "reply",
+                "--since": "since", "--until": "until", "--type": "type",
+                "--grep": "grep", "--limit": "limit"}
+# Commands that take a value: flag -> (command, option)
+_COMMAND_VALUE_FLAGS = {"--ops-since": ("ops", "seq"), "--storage": ("storage", "storage")}
+_SWITCH_FLAGS = {"--mirror": "mirror", "--unfurl": "unfurl", "--json": "json"}
+
+
+def socket_path(root=SCRIPT_DIR):
+    root = Path(root)
+    git_dir = root / ".git"
+    return str(git_dir / SOCKET_NAME if git_dir.is_dir() else root / f".{SOCKET_NAME}")
+
+
+def parse_args(args, cwd=None):
+    """(command, opts) for a whatsup argument list, or None if the daemon
+    does not handle it (init, serve, help, unknown flags)."""
+    command, opts = "post", {"tags": []}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in _COMMAND_FLAGS:
+            command = _COMMAND_FLAGS[arg]
+        elif arg in _ID_FLAGS:
+            command = _ID_FLAGS[arg]
+            opts["id"] = args.pop(0) if args else ""
+        elif arg in _COMMAND_VALUE_FLAGS:
+            command, key = _COMMAND_VALUE_FLAGS[arg]
+            opts[key] = args.pop(0) if args else ""
+        elif arg in _VALUE_FLAGS:
+            opts[_VALUE_FLAGS[arg]] = args.pop(0) if args else ""
+        elif arg in _SWITCH_FLAGS:
+            opts[_SWITCH_FLAGS[arg]] = True
+        elif arg == "--tag":
+            opts["tags"].append((args.pop(0) if args else "").strip())
+        elif arg.startswith("-"):
+            return None
+        else:
+            opts["content"] = arg
+    for key in ("pdf", "image"):
+        if opts.get(key) and cwd is not None:
+            opts[key] = os.path.join(cwd, opts[key])
+    return command, opts
+
+
+# ── Client ────────────────────────────────────────────────────────────
+
+def connect(root=SCRIPT_DIR):
+    """A socket connected to root's daemon, or None if none is running."""
+    path = socket_path(root)
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _frames(sock, request):
+    sock.sendall((json.dumps(request) + "\n").encode())
+    with sock.makefile("rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def run(command, opts, root=SCRIPT_DIR, out=None, err=None):
+    """Run a command through the daemon; returns its exit status, or None
+    if no daemon is running."""
+    sock = connect(root)
+    if sock is None:
+        return None
+    out = out or sys.stdout
+    err = err or sys.stderr
+    status = 1
+    with sock:
+        for frame in _frames(sock, {"op": "run", "command": command, "opts": opts}):
+            if "out" in frame:
+                out.write(frame["out"])
+            elif "err" in frame:
+                err.write(frame["err"])
+            elif "status" in frame:
+                status = frame["status"]
+                break
+    return status
+
+
+def run_cli(args, root=SCRIPT_DIR, cwd=SCRIPT_DIR):
+    """Run whatsup args through the daemon; returns (ok, stdout, stderr) like
+    the GUIs' subprocess runner, or None to fall back to the CLI."""
+    import io
+
+    parsed = parse_args(args, cwd)
+    if parsed is None:
+        return None
+    out, err = io.StringIO(), io.StringIO()
+    try:
+        status = run(*parsed, root=root, out=out, err=err)
+    except (OSError, ValueError) as e:
+        return (False, out.getvalue(), f"whatsup daemon: {e}")
+    if status is None:
+        return None
+    return (status == 0, out.getvalue(), err.getvalue())
+
+
+def main_run(command):
+    """Entry point for ./whatsup: through the daemon if it is up, else direct."""
+    opts = timeline.opts_from_env()
+    try:
+        status = run(command, opts)
+    except (OSError, ValueError) as e:
+        # The daemon may already have applied the command, so don't retry
+        print(f"Error: lost the whatsup daemon mid-command ({e})", file=sys.stderr)
+        return 1
+    if status is not None:
+        return status
+
+    tl = timeline.for_root(".")
+    status, change = timeline.run(command, opts, tl)
+    if status == 0 and change:
+        sys.stdout.flush()
+        ok, _ = gitsync.commit(*change)
+        if not ok:
+            return 1
+        if command == "post":
+            print("Pushed.")
+    return status
+
+
+# ── Server ────────────────────────────────────────────────────────────
+
+class _FrameWriter:
+    """File-like object that forwards writes to the client as frames."""
+
+    def __init__(self, wfile, key):
+        self.wfile = wfile
+        self.key = key
+        self.buf = []
+        self.size = 0
+
+    def write(self, text):
+        self.buf.append(text)
+        self.size += len(text)
+        if self.size >= FRAME_BYTES:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.buf:
+            frame = {self.key: "".join(self.buf)}
+            self.buf, self.size = [], 0
+            self.wfile.write((json.dumps(frame) + "\n").encode())
+            self.wfile.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, frame):
+        self.wfile.write((json.dumps(frame) + "\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+            except ValueError:
+                self._send({"err": "bad request\n"})
+                self._send({"status": 2})
+                return
+            op = req.get("op")
+            try:
+                if op == "run":
+                    self._run(req.get("command"), req.get("opts") or {})
+                else:
+                    self._send({"err": f"unknown op {op!r}\n"})
+                    self._send({"status": 2})
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def _run(self, command, opts):
+        server = self.server
+        if command not in timeline.COMMANDS:
+            self._send({"err": f"unknown command {command!r}\n"})
+            self._send({"status": 2})
+            return
+        out = _FrameWriter(self.wfile, "out")
+        err = _FrameWriter(self.wfile, "err")
+        try:
+            # Writes serialize on the Timeline's lock; git runs afterwards
+            status, change = timeline.run(command, opts, server.timeline, out, err)
+        except Exception as e:
+            status, change = 1, None
+            err.write(f"Error: {type(e).__name__}: {e}\n")
+        out.flush()
+        err.flush()
+        if status == 0 and change:
+            server.syncer.submit(*change)
+        self._send({"status": status})
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, root="."):
+        self.root = str(root)
+        self.path = socket_path(root)
+        self.timeline = timeline.for_root(root, index_ids=True)
+        self.syncer = gitsync.GitSyncer(self.root)
+        if os.path.exists(self.path):
+            probe = connect(root)
+            if probe is not None:
+                probe.close()
+                raise RuntimeError(f"a whatsup daemon is already listening on {self.path}")
+            os.unlink(self.path)
+        super().__init__(self.path, _Handler)
+        os.chmod(self.path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def serve(root="."):
+    server = DaemonServer(root)
+    sys.stderr.write(f"[whatsup] daemon listening on {server.path}\n")
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Let queued commits finish before exiting
+        server.syncer.wait(30)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "run":
+        try:
+            status = main_run(sys.argv[2])
+            sys.stdout.flush()
+            sys.exit(status)
+        except BrokenPipeError:
+            # Reader went away (e.g. --list piped into head): stop quietly
+            sys.stdout = open(os.devnull, "w")
+            sys.exit(0)
+    elif len(sys.argv) == 2 and sys.argv[1] == "serve":
+        try:
+            serve(".")
+        except RuntimeError as e:
+            sys.exit(f"Error: {e}")
+    else:
+        sys.exit("usage: daemon.py serve | run <command>")
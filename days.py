@@ -0,0 +1,128 @@
+"""Day bucketing for whatsup.
+
+Entries keep their timestamps in UTC, but each one is filed under the
+calendar date of the timezone in config.json, so a local day is always a
+single data/entries/<date>.json and the manifest's first/last times read
+in that zone. An unknown or missing zone falls back to UTC.
+"""
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone
+
+import storage
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+DAY_FILE = re.compile(r"^\d{4}-\d{2}-\d{2}\.json$")
+
+
+def zone(config=None):
+    """The tzinfo named by config["timezone"] (config.json if not given)."""
+    if config is None:
+        try:
+            with open("config.json") as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            config = {}
+    name = config.get("timezone") or "UTC"
+    if ZoneInfo is None or name == "UTC":
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def parse_ts(ts):
+    return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+
+
+def local_date(ts, tz):
+    """Day file an entry with UTC timestamp ts belongs in."""
+    return parse_ts(ts).astimezone(tz).strftime("%Y-%m-%d")
+
+
+def today(tz):
+    return datetime.now(tz).strftime("%Y-%m-%d")
+
+
+def day_record(date, entries, tz):
+    """Manifest record for a non-empty day, with times in tz."""
+    times = [parse_ts(e["ts"]).astimezone(tz) for e in entries]
+    return {
+        "date": date,
+        "count": len(entries),
+        "firstEntry": min(times).strftime("%H:%M"),
+        "lastEntry": max(times).strftime("%H:%M"),
+    }
+
+
+def _write_day(path, entries, mode):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(storage.dumps(entries, mode))
+    os.replace(tmp, path)
+
+
+def rebucket(tz, entries_dir="data/entries", track=(), mode=storage.PRETTY):
+    """Re-file every entry under its local date in tz, in one streaming pass.
+
+    Day files are read oldest first. An entry can only move a day or two
+    from the file it was in, so once file D has been read every local day
+    before D - 1 is complete and is written out and dropped from memory.
+    The new files are built in a staging directory that replaces
+    entries_dir at the end, so an interrupted run leaves the old layout.
+
+    Files are written in the given storage mode (see storage.py).
+
+    Returns (manifest, moves, new_dates) where moves lists (id, old date,
+    new date) for entries that changed day and new_dates maps the IDs in
+    track to their new date.
+    """
+    staging = f"{entries_dir}.rebucket"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    names = sorted(n for n in os.listdir(entries_dir) if DAY_FILE.match(n))
+    track = set(track)
+    buffered = {}
+    manifest = []
+    moves = []
+    new_dates = {}
+
+    def flush(before):
+        for date in sorted(d for d in buffered if before is None or d < before):
+            entries = sorted(buffered.pop(date), key=lambda e: e.get("ts", ""))
+            _write_day(f"{staging}/{date}.json", entries, mode)
+            manifest.append(day_record(date, entries, tz))
+
+    for name in names:
+        date = name[:-5]
+        with open(f"{entries_dir}/{name}") as f:
+            entries = storage.loads(f.read())
+        for e in entries:
+            try:
+                target = local_date(e["ts"], tz)
+            except (KeyError, ValueError):
+                target = date
+            if target != date:
+                moves.append((e.get("id"), date, target))
+            if e.get("id") in track:
+                new_dates[e["id"]] = target
+            buffered.setdefault(target, []).append(e)
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        flush((day - timedelta(days=1)).isoformat())
+    flush(None)
+
+    old = f"{entries_dir}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    os.rename(entries_dir, old)
+    os.rename(staging, entries_dir)
+    shutil.rmtree(old)
+    manifest.sort(key=lambda m: m["date"], reverse=True)
+    return manifest, moves, new_dates
@@ -0,0 +1,260 @@
+"""Syndication feeds for whatsup.
+
+The newest entries are published as RSS 2.0 (feed.xml), Atom (atom.xml)
+and JSON Feed 1.1 (feed.json) at the repo root, next to index.html.
+feed.json doubles as the record of which entries the feeds hold: each
+item carries {"_whatsup": {"id": ..., "date": ...}}, so after a write update() only
+adjusts that short list and re-reads the day files at its head instead
+of walking the whole history. Timestamps in the output come from the
+entries themselves, never the clock, so rewriting unchanged feeds yields
+identical bytes (and files that are identical are not rewritten), which
+keeps the ETags static hosts derive from them stable.
+
+Absolute links need the site's address: config.json's "url", else the
+domain in CNAME.
+"""
+
+import email.utils
+import json
+import mimetypes
+import os
+from html import escape
+from pathlib import Path
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape as xml_escape, quoteattr
+
+import days
+
+FEED_SIZE = 50        # entries kept in the feeds (config.json "feedSize")
+TITLE_CHARS = 80      # RSS/Atom titles are the first line of content, cut here
+RSS_PATH = "feed.xml"
+ATOM_PATH = "atom.xml"
+JSON_PATH = "feed.json"
+PATHS = (RSS_PATH, ATOM_PATH, JSON_PATH)
+
+MIME_TYPES = {"gif": "image/gif", "pdf": "application/pdf"}
+
+
+def base_url(root=".", config=None):
+    """The site's address with a trailing slash, or "" if it is unknown."""
+    url = (config or {}).get("url") or ""
+    if not url:
+        try:
+            host = Path(root, "CNAME").read_text().split()[0]
+            url = host if "://" in host else f"https://{host}"
+        except (OSError, IndexError):
+            return ""
+    return url.rstrip("/") + "/"
+
+
+# ── Head of the timeline ──
+
+def _load_head(root):
+    try:
+        feed = json.loads(Path(root, JSON_PATH).read_text())
+        return [(item["_whatsup"]["date"], item["_whatsup"]["id"]) for item in feed["items"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _scan_head(tl, size):
+    head = []
+    for date, e in tl.query():
+        head.append((date, e["id"]))
+        if len(head) >= size:
+            break
+    return head
+
+
+def _resolve(tl, head):
+    """(date, entry) pairs for head, newest first, dropping vanished IDs."""
+    pairs = []
+    for date, eid in head:
+        for e in tl.day(date):
+            if e.get("id") == eid:
+                pairs.append((date, e))
+                break
+    pairs.sort(key=lambda p: (p[0], p[1].get("ts", "")), reverse=True)
+    return pairs
+
+
+def update(tl, op=None):
+    """Bring the feeds in line with tl after op (an op log record, or None
+    to rebuild the head from the day files). Returns the paths written."""
+    config = tl.config()
+    size = int(config.get("feedSize", FEED_SIZE))
+    head = None if op is None else _load_head(tl.root)
+    if head is None:
+        return write(tl.root, config, _resolve(tl, _scan_head(tl, size)))
+    listed = any(eid == op["id"] for _, eid in head)
+    head = [h for h in head if h[1] != op["id"]]
+    if op["op"] == "post" or (op["op"] == "edit" and listed):
+        head.append((op["date"], op["id"]))
+    elif not listed:
+        return []
+    elif len(head) + 1 >= size:
+        # A delete from a full feed lets an older entry move up
+        return write(tl.root, config, _resolve(tl, _scan_head(tl, size)))
+    return write(tl.root, config, _resolve(tl, head)[:size])
+
+
+# ── Rendering ──
+
+def _abs(base, url):
+    return urljoin(base, url) if base else url
+
+
+def _title(entry):
+    text = " ".join((entry.get("content") or "").split())
+    return text if len(text) <= TITLE_CHARS else text[:TITLE_CHARS - 1].rstrip() + "…"
+
+
+def _mime(att):
+    return (MIME_TYPES.get(att.get("type"))
+            or mimetypes.guess_type(att.get("url", ""))[0] or "application/octet-stream")
+
+
+def _html(base, entry):
+    """The entry as an HTML fragment for RSS descriptions and Atom content."""
+    parts = [f"<p>{escape(entry.get('content') or '')}</p>"]
+    if entry.get("mood"):
+        parts.append(f"<p>mood: {escape(entry['mood'])}</p>")
+    for link in entry.get("links") or []:
+        title = link.get("title") or link.get("url", "")
+        parts.append(f'<p><a href="{escape(link["url"])}">{escape(title)}</a></p>')
+    for att in entry.get("attachments") or []:
+        url = escape(_abs(base, att.get("url", "")))
+        if att.get("type") in ("gif", "image"):
+            parts.append(f'<p><img src="{url}" alt="{escape(att.get("title") or "")}"></p>')
+        else:
+            parts.append(f'<p><a href="{url}">{escape(att.get("title") or att.get("url", ""))}</a></p>')
+    if entry.get("tags"):
+        parts.append("<p>" + " ".join(f"#{escape(t)}" for t in entry["tags"]) + "</p>")
+    return "".join(parts)
+
+
+def _guid(base, entry):
+    return f"{base}#{entry['id']}" if base else entry["id"]
+
+
+def render_json(base, config, pairs):
+    items = []
+    for date, e in pairs:
+        item = {
+            "id": _guid(base, e),
+            "url": f"{base}#/{date}",
+            "content_text": e.get("content") or "",
+            "content_html": _html(base, e),
+            "date_published": e["ts"],
+            "tags": e.get("tags") or [],
+        }
+        if e.get("links"):
+            item["external_url"] = e["links"][0]["url"]
+        if e.get("attachments"):
+            item["attachments"] = [
+                dict({"url": _abs(base, a.get("url", "")), "mime_type": _mime(a)},
+                     **({"title": a["title"]} if a.get("title") else {}),
+                     **({"size_in_bytes": a["size"]} if a.get("size") else {}))
+                for a in e["attachments"]]
+        item["_whatsup"] = {"id": e["id"], "date": date, "type": e.get("type"), "mood": e.get("mood"),
+                            "replyTo": e.get("replyTo")}
+        items.append(item)
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": config.get("name") or "whatsup",
+        "home_page_url": base or None,
+        "feed_url": _abs(base, JSON_PATH) if base else None,
+        "description": config.get("bio") or "",
+        "authors": [{"name": config.get("name") or "whatsup",
+                     **({"avatar": _abs(base, config["avatar"])} if config.get("avatar") else {})}],
+        "items": items,
+    }
+    feed = {k: v for k, v in feed.items() if v is not None}
+    return json.dumps(feed, indent=2, ensure_ascii=False) + "\n"
+
+
+def render_rss(base, config, pairs):
+    title = xml_escape(config.get("name") or "whatsup")
+    out = ['<?xml version="1.0" encoding="utf-8"?>',
+           '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">',
+           "<channel>",
+           f"<title>{title}</title>",
+           f"<link>{xml_escape(base)}</link>",
+           f"<description>{xml_escape(config.get('bio') or '')}</description>"]
+    if base:
+        out.append(f'<atom:link href={quoteattr(base + RSS_PATH)} rel="self" type="application/rss+xml"/>')
+    if pairs:
+        newest = max(e["ts"] for _, e in pairs)
+        out.append(f"<lastBuildDate>{email.utils.format_datetime(days.parse_ts(newest))}</lastBuildDate>")
+    for date, e in pairs:
+        out.append("<item>")
+        out.append(f"<title>{xml_escape(_title(e))}</title>")
+        out.append(f"<link>{xml_escape(f'{base}#/{date}')}</link>")
+        out.append(f'<guid isPermaLink="false">{xml_escape(_guid(base, e))}</guid>')
+        out.append(f"<pubDate>{email.utils.format_datetime(days.parse_ts(e['ts']))}</pubDate>")
+        out.append(f"<description>{xml_escape(_html(base, e))}</description>")
+        for tag in e.get("tags") or []:
+            out.append(f"<category>{xml_escape(tag)}</category>")
+        if e.get("mood"):
+            out.append(f'<category domain="mood">{xml_escape(e["mood"])}</category>')
+        # RSS allows a single enclosure per item
+        for a in (e.get("attachments") or [])[:1]:
+            out.append(f"<enclosure url={quoteattr(_abs(base, a.get('url', '')))} "
+                       f"length=\"{int(a.get('size') or 0)}\" type={quoteattr(_mime(a))}/>")
+        out.append("</item>")
+    out += ["</channel>", "</rss>", ""]
+    return "\n".join(out)
+
+
+def render_atom(base, config, pairs):
+    name = xml_escape(config.get("name") or "whatsup")
+    updated = max((e["ts"] for _, e in pairs), default="1970-01-01T00:00:00Z")
+    out = ['<?xml version="1.0" encoding="utf-8"?>',
+           '<feed xmlns="http://www.w3.org/2005/Atom">',
+           f"<id>{xml_escape(base or 'urn:whatsup')}</id>",
+           f"<title>{name}</title>",
+           f"<subtitle>{xml_escape(config.get('bio') or '')}</subtitle>",
+           f"<updated>{updated}</updated>",
+           f"<author><name>{name}</name></author>"]
+    if base:
+        out.append(f'<link rel="alternate" href={quoteattr(base)}/>')
+        out.append(f'<link rel="self" href={quoteattr(base + ATOM_PATH)}/>')
+    for date, e in pairs:
+        out.append("<entry>")
+        out.append(f"<id>{xml_escape(_guid(base, e))}</id>")
+        out.append(f"<title>{xml_escape(_title(e))}</title>")
+        out.append(f"<updated>{e['ts']}</updated>")
+        out.append(f'<link rel="alternate" href={quoteattr(f"{base}#/{date}")}/>')
+        for link in e.get("links") or []:
+            out.append(f'<link rel="related" href={quoteattr(link["url"])}/>')
+        for a in e.get("attachments") or []:
+            length = f' length="{int(a["size"])}"' if a.get("size") else ""
+            out.append(f'<link rel="enclosure" href={quoteattr(_abs(base, a.get("url", "")))} '
+                       f'type={quoteattr(_mime(a))}{length}/>')
+        for tag in e.get("tags") or []:
+            out.append(f"<category term={quoteattr(tag)}/>")
+        if e.get("mood"):
+            out.append(f'<category term={quoteattr(e["mood"])} scheme="mood"/>')
+        out.append(f'<content type="html">{xml_escape(_html(base, e))}</content>')
+        out.append("</entry>")
+    out += ["</feed>", ""]
+    return "\n".join(out)
+
+
+def write(root, config, pairs):
+    """Render pairs into the three feeds; returns the paths whose bytes changed."""
+    base = base_url(root, config)
+    changed = []
+    for path, render in ((RSS_PATH, render_rss), (ATOM_PATH, render_atom), (JSON_PATH, render_json)):
+        data = render(base, config, pairs).encode()
+        target = Path(root, path)
+        try:
+            if target.read_bytes() == data:
+                continue
+        except OSError:
+            pass
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+        changed.append(path)
+    return changed
@@ -0,0 +1,159 @@
+"""Recording whatsup changes in git.
+
+commit() records exactly the paths a command reported and publishes, through
+git plumbing: hash-object stores the changed files, update-index points
+the index at them, and write-tree / commit-tree / update-ref make the
+commit. Nothing stats the rest of the working tree, so a commit costs
+the same however many day files and assets the repo holds. Pushing goes
+through publish.py (primary remote in the foreground, mirrors behind it).
+GitSyncer does it on a background thread for the daemon, folding writes
+that arrive while a push is in flight into the next commit.
+"""
+
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+import publish
+
+NULL_SHA = "0" * 40
+
+
+def _git(root, *args, capture=False, input=None):
+    return subprocess.run(["git", *args], cwd=root, capture_output=capture, text=True, input=input)
+
+
+def _changes(root, paths):
+    """(files to store, index entries to drop) for the reported paths.
+
+    Directories (reported by bulk commands such as rebucket) are listed
+    through git so .gitignore applies, as `git add -A <dir>` would.
+    """
+    files, gone = [], []
+    for p in paths:
+        full = os.path.join(root, p)
+        if os.path.isdir(full):
+            listed = _git(root, "ls-files", "-z", "--cached", "--others", "--exclude-standard",
+                          "--", p, capture=True).stdout
+            for name in sorted(set(filter(None, listed.split("\0")))):
+                (files if os.path.isfile(os.path.join(root, name)) else gone).append(name)
+        elif os.path.isfile(full):
+            files.append(p)
+        else:
+            gone.append(p)
+    return files, gone
+
+
+def commit(paths, message, root=".", push=True, capture=False):
+    """Commit the current contents of paths (files or directories, deleted
+    ones included) on top of HEAD, and push.
+
+    Returns (ok, output); output is only collected when capture is set.
+    Nothing to commit counts as success.
+    """
+    output = []
+
+    def step(*args, input=None):
+        result = _git(root, *args, capture=True, input=input)
+        if capture or result.returncode != 0:
+            output.append(result.stderr)
+        return result
+
+    files, gone = _changes(root, paths)
+    lines = []
+    if files:
+        hashed = step("hash-object", "-w", "--stdin-paths", input="\n".join(files) + "\n")
+        if hashed.returncode != 0:
+            return False, _report(output, capture)
+        for path, sha in zip(files, hashed.stdout.split()):
+            mode = "100755" if os.stat(os.path.join(root, path)).st_mode & 0o100 else "100644"
+            lines.append(f"{mode} {sha}\t{path}")
+    lines += [f"0 {NULL_SHA}\t{path}" for path in gone]
+    if lines and step("update-index", "--index-info", input="\n".join(lines) + "\n").returncode != 0:
+        return False, _report(output, capture)
+
+    tree = step("write-tree")
+    if tree.returncode != 0:
+        return False, _report(output, capture)
+    tree = tree.stdout.strip()
+    current = _git(root, "rev-parse", "HEAD", "HEAD^{tree}", capture=True)
+    head, parent = "", []
+    if current.returncode == 0:
+        head, head_tree = current.stdout.split()
+        if head_tree == tree:
+            return True, _report(output, capture)
+        parent = ["-p", head]
+    made = step("commit-tree", tree, *parent, "-F", "-", input=message + "\n")
+    if made.returncode != 0:
+        return False, _report(output, capture)
+    new = made.stdout.strip()
+    subject = message.splitlines()[0] if message else ""
+    if step("update-ref", "-m", f"commit: {subject}", "HEAD", new, head or NULL_SHA).returncode != 0:
+        return False, _report(output, capture)
+    if not capture:
+        print(f"[{new[:7]}] {subject}")
+    if push:
+        ok, pushed = publish.push(root, capture=capture)
+        if capture:
+            output.append(pushed)
+        if not ok:
+            return False, "".join(output)
+    return True, _report(output, capture)
+
+
+def _report(output, capture):
+    text = "".join(output)
+    if not capture and text:
+        sys.stderr.write(text)
+    return text
+
+
+class GitSyncer:
+    """Commits and pushes submitted changes in order on a daemon thread."""
+
+    def __init__(self, root=".", push=True):
+        self.root = root
+        self.push = push
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._unsynced = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, paths, message):
+        with self._cond:
+            self._unsynced += 1
+        self._queue.put((list(paths), message))
+
+    def wait(self, timeout=None):
+        """Block until everything submitted so far has been committed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unsynced == 0, timeout)
+
+    def close(self, timeout=30):
+        """Finish what was submitted, then stop the thread."""
+        self.wait(timeout)
+        self._queue.put(None)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                return
+            paths = sorted({p for ps, _ in batch for p in ps})
+            if len(batch) == 1:
+                message = batch[0][1]
+            else:
+                message = f"whatsup: {len(batch)} changes\n\n" + "\n".join(m for _, m in batch)
+            ok, output = commit(paths, message, self.root, self.push, capture=True)
+            if not ok:
+                sys.stderr.write(f"[whatsup] git sync failed:\n{output}")
+            with self._cond:
+                self._unsynced -= len(batch)
+                self._cond.notify_all()
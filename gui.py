@@ -3,10 +3,14 @@
 
 import json
 import os
+import re
 import subprocess
 import sys
 import threading
 import webbrowser
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from tkinter import filedialog, messagebox
@@ -19,6 +23,10 @@ except ImportError:
     print("  sudo apt install python3-tk")
     sys.exit(1)
 
+import daemon
+import days
+import storage
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 
 # ── Theme colours (IBM retro cream) ──────────────────────────────────
@@ -58,6 +66,209 @@ MOOD_EMOJI = {
 
 MOODS = ["", "focused", "happy", "tired", "excited", "frustrated", "chill", "thinking", "creative"]
 
+# ── Timeline virtualization ──────────────────────────────────────────
+
+CARD_ESTIMATE = 96   # px assumed for a card that has not been measured yet
+CARD_GAP      = 8    # px between cards
+OVERSCAN      = 600  # px of cards kept rendered above and below the viewport
+
+WATCH_INTERVAL = 1.0  # seconds between polls of data/ for outside changes
+DAY_CACHE_SIZE = 32   # parsed day files kept in memory
+POSTER_CACHE_SIZE = 64  # decoded GIF posters kept in memory
+POSTER_WIDTH = 240      # px; larger posters are subsampled down to about this
+
+
+class DayCache:
+    """Thread-safe LRU cache of parsed day files, validated by mtime and size."""
+
+    def __init__(self, capacity=DAY_CACHE_SIZE):
+        self.capacity = capacity
+        self._days = OrderedDict()   # date -> (signature, entries)
+        self._lock = threading.Lock()
+
+    def peek(self, date):
+        """Return the cached entries for date without touching the disk, or None."""
+        with self._lock:
+            hit = self._days.get(date)
+            if hit is None:
+                return None
+            self._days.move_to_end(date)
+            return hit[1]
+
+    def load(self, date):
+        """Return the entries for date, re-parsing only if the file changed."""
+        path = SCRIPT_DIR / "data" / "entries" / f"{date}.json"
+        try:
+            st = os.stat(path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = None
+
+        with self._lock:
+            hit = self._days.get(date)
+            if hit is not None and hit[0] == sig:
+                self._days.move_to_end(date)
+                return hit[1]
+
+        entries = []
+        if sig is not None:
+            try:
+                entries = storage.loads(path.read_text())
+            except Exception:
+                entries = []
+
+        with self._lock:
+            self._days[date] = (sig, entries)
+            self._days.move_to_end(date)
+            while len(self._days) > self.capacity:
+                self._days.popitem(last=False)
+        return entries
+
+
+class EntryCard:
+    """A recyclable timeline row. bind() reconfigures it for another entry."""
+
+    def __init__(self, gui, canvas):
+        self.gui = gui
+        self.entry = None
+        font = gui.font_family
+
+        self.row = tk.Frame(canvas, bg=BG)
+        self.window = canvas.create_window(0, 0, window=self.row, anchor="nw",
+                                           width=canvas.winfo_width(), state="hidden")
+
+        # Time column
+        self.time_label = tk.Label(self.row, font=(font, 10), bg=BG, fg=MUTED,
+                                   width=6, anchor="ne")
+        self.time_label.pack(side="left", padx=(0, 4), anchor="n", pady=4)
+
+        # Vertical separator
+        tk.Frame(self.row, bg=BORDER, width=1).pack(side="left", fill="y", padx=(0, 8))
+
+        # Card with mood accent stripe
+        self.card_outer = tk.Frame(self.row, bg=BORDER, padx=0, pady=0)
+        self.card_outer.pack(side="left", fill="x", expand=True)
+        self.stripe = tk.Frame(self.card_outer, bg=BORDER, width=3)
+        self.stripe.pack(side="left", fill="y")
+        card_border = tk.Frame(self.card_outer, bg=BORDER, padx=1, pady=1)
+        card_border.pack(side="left", fill="x", expand=True)
+        self.card = tk.Frame(card_border, bg=CARD_BG, padx=10, pady=8)
+        self.card.pack(fill="x", expand=True)
+
+        # Optional sections, packed on demand in bind()
+        self.mood_badge = tk.Label(self.card, font=(font, 10, "bold"), bg=CARD_BG)
+        self.reply_label = tk.Label(self.card, font=(font, 9), bg=CARD_BG, fg=MUTED)
+        self.content_label = tk.Label(self.card, font=(font, 11), bg=CARD_BG, fg=TEXT,
+                                      wraplength=500, justify="left", anchor="w")
+        self.link_labels = []
+        self.att_labels = []
+
+        # Bottom row: tags + ID
+        self.bottom = tk.Frame(self.card, bg=CARD_BG)
+        self.tag_labels = []
+        self.id_label = tk.Label(self.bottom, font=(font, 9), bg=CARD_BG, fg=MUTED, cursor="hand2")
+        self.id_label.pack(side="right")
+        self.id_label.bind("<Button-1>", lambda e: self.entry and gui._show_entry_menu(e, self.entry))
+
+    def _link_label(self, i):
+        while len(self.link_labels) <= i:
+            lbl = tk.Label(self.card, font=(self.gui.font_family, 10), bg=CARD_BG,
+                           fg=LINK_CLR, cursor="hand2", anchor="w")
+            lbl.url = ""
+            lbl.bind("<Button-1>", lambda e, l=lbl: l.url and webbrowser.open(l.url))
+            self.link_labels.append(lbl)
+        return self.link_labels[i]
+
+    def _att_label(self, i):
+        while len(self.att_labels) <= i:
+            self.att_labels.append(tk.Label(self.card, font=(self.gui.font_family, 9),
+                                            bg=CARD_BG, fg=MUTED, anchor="w"))
+        return self.att_labels[i]
+
+    def _tag_label(self, i):
+        while len(self.tag_labels) <= i:
+            self.tag_labels.append(tk.Label(self.bottom, font=(self.gui.font_family, 9),
+                                            bg=TAG_BG, fg=MUTED, padx=4, pady=1,
+                                            relief="solid", borderwidth=1))
+        return self.tag_labels[i]
+
+    def bind(self, entry):
+        self.entry = entry
+
+        ts = entry.get("ts", "")
+        try:
+            dt = days.parse_ts(ts).astimezone(self.gui.tz)
+            time_str = dt.strftime("%H:%M")
+        except Exception:
+            time_str = ""
+        self.time_label.configure(text=time_str)
+
+        mood = entry.get("mood")
+        mood_color = MOOD_COLORS.get(mood, BORDER) if mood else BORDER
+        self.card_outer.configure(bg=mood_color)
+        self.stripe.configure(bg=mood_color)
+
+        # Sections are re-packed in display order every time
+        for w in self.card.pack_slaves():
+            w.pack_forget()
+        for w in self.tag_labels:
+            w.pack_forget()
+
+        # Mood badge
+        if entry.get("type") == "mood" and mood:
+            emoji = MOOD_EMOJI.get(mood, "\U0001f4ad")
+            self.mood_badge.configure(text=f"{emoji} {mood}", fg=mood_color)
+            self.mood_badge.pack(anchor="w", pady=(0, 4))
+
+        # Reply preview
+        if entry.get("type") == "reply" and entry.get("replyTo"):
+            self.reply_label.configure(text=f"\u21b3 replying to {entry['replyTo']}")
+            self.reply_label.pack(anchor="w", pady=(0, 2))
+
+        # Content
+        content = entry.get("content", "")
+        if content:
+            self.content_label.configure(text=content)
+            self.content_label.pack(anchor="w", fill="x")
+
+        # Links
+        for i, link in enumerate(entry.get("links", [])):
+            lbl = self._link_label(i)
+            lbl.configure(text=f"\U0001f517 {link.get('title', link.get('url', ''))}")
+            lbl.url = link.get("url", "")
+            lbl.pack(anchor="w", pady=(2, 0))
+
+        # Attachments
+        for i, att in enumerate(entry.get("attachments", [])):
+            att_type = att.get("type", "")
+            image = ""
+            if att_type == "gif" or att_type == "image":
+                att_text = f"\U0001f3ac GIF: {att.get('source', att.get('url', ''))[:50]}"
+                image = self.gui.poster_image(att.get("poster")) or ""
+            elif att_type == "pdf":
+                att_text = f"\U0001f4c4 {att.get('title', 'PDF')}"
+            else:
+                att_text = f"Attachment: {att.get('url', '')[:50]}"
+            lbl = self._att_label(i)
+            lbl.configure(text=att_text, image=image, compound="top" if image else "none")
+            lbl.pack(anchor="w", pady=(2, 0))
+
+        for i, tag in enumerate(entry.get("tags") or []):
+            lbl = self._tag_label(i)
+            lbl.configure(text=f"#{tag}")
+            lbl.pack(side="left", padx=(0, 4))
+
+        # Posts still in the outbox say so where their ID will be
+        pending = entry.get("_pending")
+        self.content_label.configure(fg=MUTED if pending else TEXT)
+        if pending == "failed":
+            self.id_label.configure(text="\u26a0 not posted \u2013 click to retry", fg=ACCENT)
+        elif pending:
+            self.id_label.configure(text="\u23f3 sending\u2026", fg=MUTED)
+        else:
+            self.id_label.configure(text=entry.get("id", ""), fg=MUTED)
+        self.bottom.pack(fill="x", pady=(4, 0))
+
 
 class WhatsUpGUI:
     def __init__(self):
@@ -75,7 +286,26 @@ class WhatsUpGUI:
         self.tags = []
         self.edit_id = None
         self.server_proc = None
-        self.timeline_widgets = []
+        self.day_cache = DayCache()
+        self.posters = OrderedDict()
+        self._load_token = 0
+        self.day_entries = []   # the shown day as read from disk, without pending posts
+        self.shown_date = None
+
+        # Outgoing writes run one at a time on this thread, in order. Posts
+        # wait in the outbox, shown as pending cards, until the CLI confirms
+        # them and a reload shows the stored entry (see _queue_post).
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.outbox = []
+        self._outbox_seq = 0
+
+        # Virtualized timeline: measured row heights by entry ID, the y offset
+        # of every row, and the pool of cards currently on / off screen
+        self.row_heights = {}
+        self.row_offsets = [0]
+        self.visible_cards = {}
+        self.free_cards = []
+        self._layout_pending = False
 
         self._detect_font()
         self._load_config()
@@ -86,10 +316,11 @@ class WhatsUpGUI:
             dates = sorted([m["date"] for m in self.manifest], reverse=True)
             self.current_date = dates[0]
         else:
-            self.current_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            self.current_date = days.today(self.tz)
 
         self._build_ui()
         self.load_timeline()
+        self._start_watcher()
 
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.root.mainloop()
@@ -117,16 +348,59 @@ class WhatsUpGUI:
                 self.config = json.loads(path.read_text())
             except Exception:
                 pass
+        self.tz = days.zone(self.config)
 
     def _load_manifest(self):
+        self.manifest = self._read_manifest()
+
+    @staticmethod
+    def _read_manifest():
         path = SCRIPT_DIR / "data" / "index.json"
         if path.exists():
             try:
-                self.manifest = json.loads(path.read_text())
+                return json.loads(path.read_text())
             except Exception:
-                self.manifest = []
+                pass
+        return []
+
+    def _start_watcher(self):
+        """Poll the manifest and the shown day file, refreshing when either
+        changes on disk (posts from the CLI or web GUI, git pulls)."""
+        self._watch_stop = threading.Event()
+        manifest_path = SCRIPT_DIR / "data" / "index.json"
+
+        def signature(path):
+            try:
+                st = os.stat(path)
+                return (st.st_mtime_ns, st.st_size)
+            except OSError:
+                return None
+
+        def worker():
+            last = None
+            while not self._watch_stop.wait(WATCH_INTERVAL):
+                date = self.current_date
+                day_path = SCRIPT_DIR / "data" / "entries" / f"{date}.json"
+                sig = (date, signature(manifest_path), signature(day_path))
+                # A date switch is the GUI's own doing; only react to file changes
+                if last is not None and sig != last and sig[0] == last[0]:
+                    try:
+                        self.root.after(0, self.refresh)
+                    except RuntimeError:
+                        return
+                last = sig
+
+        threading.Thread(target=worker, daemon=True).start()
 
     def _on_close(self):
+        sending = sum(1 for p in self.outbox if p["confirmed"] is None and p["entry"]["_pending"] == "sending")
+        if sending and not messagebox.askyesno(
+                "Posts still sending", f"{sending} post{'s are' if sending > 1 else ' is'} still being sent. "
+                                       "Quit anyway? One already being sent finishes; the rest are dropped."):
+            return
+        self._watch_stop.set()
+        # Queued posts are dropped; Python still waits for the one running
+        self.writer.shutdown(wait=False, cancel_futures=True)
         if self.server_proc:
             self.server_proc.terminate()
         self.root.destroy()
@@ -319,6 +593,8 @@ class WhatsUpGUI:
         # Keyboard shortcuts
         self.root.bind("<Control-Return>", lambda e: self.do_post())
         self.root.bind("<Escape>", lambda e: self.clear_compose())
+        self.root.bind("<Alt-Left>", lambda e: self._navigate(-1))
+        self.root.bind("<Alt-Right>", lambda e: self._navigate(1))
 
     def _build_timeline(self):
         wrapper = tk.Frame(self.right, bg=BG)
@@ -327,24 +603,22 @@ class WhatsUpGUI:
         tk.Label(wrapper, text="TIMELINE", font=(self.font_family, 9, "bold"),
                  bg=BG, fg=MUTED).pack(anchor="w")
 
-        # Scrollable area
+        # Scrollable area. Cards are placed directly on the canvas and only
+        # the rows near the viewport exist as widgets (see _layout_visible).
         self.timeline_canvas = tk.Canvas(wrapper, bg=BG, highlightthickness=0, borderwidth=0)
         self.timeline_scrollbar = tk.Scrollbar(wrapper, orient="vertical",
                                                command=self.timeline_canvas.yview)
-        self.timeline_inner = tk.Frame(self.timeline_canvas, bg=BG)
-
-        self.timeline_inner.bind("<Configure>",
-                                 lambda e: self.timeline_canvas.configure(
-                                     scrollregion=self.timeline_canvas.bbox("all")))
+        self.timeline_canvas.configure(yscrollcommand=self._on_timeline_scroll)
 
-        self.canvas_window = self.timeline_canvas.create_window((0, 0), window=self.timeline_inner,
-                                                                 anchor="nw")
-        self.timeline_canvas.configure(yscrollcommand=self.timeline_scrollbar.set)
+        self.empty_label = tk.Label(self.timeline_canvas, text="No entries for this day.",
+                                    font=(self.font_family, 11), bg=BG, fg=MUTED, pady=24)
+        self.empty_window = self.timeline_canvas.create_window(0, 0, window=self.empty_label,
+                                                               anchor="nw", state="hidden")
 
         self.timeline_scrollbar.pack(side="right", fill="y")
         self.timeline_canvas.pack(side="left", fill="both", expand=True)
 
-        # Resize inner frame width to match canvas
+        # Resize cards to match canvas width
         self.timeline_canvas.bind("<Configure>", self._on_canvas_configure)
 
         # Mousewheel scrolling
@@ -356,7 +630,14 @@ class WhatsUpGUI:
                                       lambda e: self.timeline_canvas.yview_scroll(3, "units"))
 
     def _on_canvas_configure(self, event):
-        self.timeline_canvas.itemconfig(self.canvas_window, width=event.width)
+        for card in self.free_cards + list(self.visible_cards.values()):
+            self.timeline_canvas.itemconfigure(card.window, width=event.width)
+        self.timeline_canvas.itemconfigure(self.empty_window, width=event.width)
+        self._schedule_layout()
+
+    def _on_timeline_scroll(self, first, last):
+        self.timeline_scrollbar.set(first, last)
+        self._schedule_layout()
 
     def _build_statusbar(self):
         self.statusbar = tk.Label(self.root, text="Ready", font=(self.font_family, 9),
@@ -435,50 +716,128 @@ class WhatsUpGUI:
             self.set_status("Content is required", error=True)
             return
 
-        args = []
-
-        if self.edit_id:
-            args = ["--edit", self.edit_id, content]
-        else:
-            mood = self.mood_var.get()
-            if mood:
-                args.extend(["--mood", mood])
-
-            link = self.link_entry.get().strip()
-            if link:
-                args.extend(["--link", link])
-
-            reply = self.reply_entry.get().strip()
-            if reply:
-                args.extend(["--reply", reply])
-
-            gif = self.gif_entry.get().strip()
-            if gif:
-                args.extend(["--gif", gif])
-
-            pdf = getattr(self.pdf_path_var, "_full_path", "")
-            if pdf:
-                args.extend(["--pdf", pdf])
-
-            for tag in self.tags:
-                args.extend(["--tag", tag])
-
-            args.append(content)
+        if not self.edit_id:
+            self._queue_post(content)
+            return
 
-        self.set_status("Posting..." if not self.edit_id else "Saving edit...")
+        self.set_status("Saving edit...")
         self.post_btn.configure(state="disabled")
 
         def callback(ok, stdout, stderr):
             self.post_btn.configure(state="normal")
             if ok:
-                action = "Saved" if self.edit_id else "Posted"
-                self.set_status(f"{action}: {stdout.strip()}")
+                self.set_status(f"Saved: {stdout.strip()}")
                 self.clear_compose()
                 self.refresh()
             else:
                 self.set_status(f"Error: {stderr.strip()}", error=True)
 
-        self.run_cli_async(args, callback)
+        self.run_cli_async(["--edit", self.edit_id, content], callback)
+
+    # ── Outbox ───────────────────────────────────────────────────────
+
+    def _queue_post(self, content):
+        """Show the composed post at once as a pending card, clear the form
+        and send it in the background."""
+        args = []
+        mood = self.mood_var.get()
+        link = self.link_entry.get().strip()
+        reply = self.reply_entry.get().strip()
+        gif = self.gif_entry.get().strip()
+        pdf = getattr(self.pdf_path_var, "_full_path", "")
+        if mood:
+            args.extend(["--mood", mood])
+        if link:
+            args.extend(["--link", link])
+        if reply:
+            args.extend(["--reply", reply])
+        if gif:
+            args.extend(["--gif", gif])
+        if pdf:
+            args.extend(["--pdf", pdf])
+        for tag in self.tags:
+            args.extend(["--tag", tag])
+        args.append(content)
+
+        # What the CLI will store, near enough to draw a card from
+        ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._outbox_seq += 1
+        entry = {
+            "id": f"pending-{self._outbox_seq}",
+            "ts": ts,
+            "type": "mood" if mood else "reply" if reply else "link" if link else "post",
+            "content": content,
+            "mood": mood or None,
+            "links": [{"url": link, "title": link}] if link else [],
+            "attachments": ([{"type": "gif", "url": gif}] if gif else [])
+                           + ([{"type": "pdf", "title": os.path.basename(pdf)}] if pdf else []),
+            "replyTo": reply or None,
+            "tags": list(self.tags),
+            "_pending": "sending",
+        }
+        item = {"args": args, "entry": entry, "date": days.local_date(ts, self.tz),
+                "queued": ts, "attempts": 0, "id": None, "confirmed": None}
+        self.outbox.append(item)
+        self.clear_compose()
+        if item["date"] != self.current_date:
+            # Follow the post to today, as a refresh after posting always did
+            self.current_date = item["date"]
+            self.date_var.set(item["date"])
+            self.load_timeline(reset_scroll=False)
+        self._send(item)
+
+    def _send(self, item):
+        item["entry"] = dict(item["entry"], _pending="sending")
+        self._show_pending()
+        waiting = sum(1 for p in self.outbox if p["confirmed"] is None)
+        self.set_status(f"Posting... ({waiting} in outbox)" if waiting > 1 else "Posting...")
+        self._submit(lambda: self._post_worker(item),
+                     lambda ok, stdout, stderr: self._on_post_done(item, ok, stdout, stderr))
+
+    def _post_worker(self, item):
+        """Runs on the writer thread."""
+        if item["attempts"]:
+            # A failed attempt may have stored the entry anyway (a timeout
+            # during the push); if so, this retry only needs to find it
+            for e in self.day_cache.load(item["date"]):
+                if e.get("content") == item["entry"]["content"] and e.get("ts", "") >= item["queued"]:
+                    return True, f"Created entry {e['id']}\n", ""
+        item["attempts"] += 1
+        return self._run_cli(item["args"])
+
+    def _on_post_done(self, item, ok, stdout, stderr):
+        if item not in self.outbox:
+            return  # discarded while it was being sent
+        if ok:
+            match = re.search(r"Created entry (\w+)", stdout)
+            item["id"] = match.group(1) if match else None
+            self.set_status(f"Posted: {stdout.strip()}")
+            # The card stays until a reload started from now shows the stored entry
+            self.refresh()
+            item["confirmed"] = self._load_token
+        else:
+            error = stderr.strip() or stdout.strip() or "post failed"
+            item["entry"] = dict(item["entry"], _pending="failed", _error=error)
+            self._show_pending()
+            self.set_status(f"Not posted: {error} (click the card's ID to retry)", error=True)
+
+    def _discard(self, item):
+        if item in self.outbox:
+            self.outbox.remove(item)
+            self._show_pending()
+
+    def _show_pending(self):
+        """Redraw the shown day with the outbox's current cards."""
+        if self.shown_date == self.current_date:
+            self._show_entries(self.day_entries, False)
+
+    def _with_pending(self, entries):
+        """entries plus the outbox's cards for the shown day, newest last."""
+        ids = {e.get("id") for e in entries}
+        # A confirmed post whose stored entry is on screen needs no card
+        self.outbox = [p for p in self.outbox if not (p["id"] and p["id"] in ids)]
+        mine = [p["entry"] for p in self.outbox if p["date"] == self.current_date]
+        return list(entries) + mine if mine else entries
 
     def do_delete(self, entry_id):
         if not messagebox.askyesno("Delete entry", f"Delete entry {entry_id}?"):
@@ -536,137 +895,224 @@ class WhatsUpGUI:
 
     # ── Data loading ─────────────────────────────────────────────────
 
-    def load_timeline(self):
-        self._load_manifest()
-        day_file = SCRIPT_DIR / "data" / "entries" / f"{self.current_date}.json"
-        if day_file.exists():
-            try:
-                self.entries = json.loads(day_file.read_text())
-            except Exception:
-                self.entries = []
-        else:
-            self.entries = []
-
-        self._render_entries()
-        self._update_sidebar()
-
-    def _render_entries(self):
-        for w in self.timeline_inner.winfo_children():
-            w.destroy()
-        self.timeline_widgets = []
-
-        if not self.entries:
-            empty = tk.Label(self.timeline_inner, text="No entries for this day.",
-                             font=(self.font_family, 11), bg=BG, fg=MUTED, pady=24)
-            empty.pack()
-            return
-
-        for entry in self.entries:
-            self._render_entry_card(entry)
-
-    def _render_entry_card(self, entry):
-        row = tk.Frame(self.timeline_inner, bg=BG)
-        row.pack(fill="x", pady=(0, 8))
-
-        # Time column
-        ts = entry.get("ts", "")
-        try:
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-            time_str = dt.strftime("%H:%M")
-        except Exception:
-            time_str = ""
-
-        time_label = tk.Label(row, text=time_str, font=(self.font_family, 10),
-                              bg=BG, fg=MUTED, width=6, anchor="ne")
-        time_label.pack(side="left", padx=(0, 4), anchor="n", pady=4)
+    def load_timeline(self, reset_scroll=True, follow_manifest=False):
+        """Show current_date. A cached copy is drawn immediately; the manifest
+        and day file are (re)read on a worker thread and applied as a diff."""
+        date = self.current_date
+        self._load_token += 1
+        token = self._load_token
+
+        cached = self.day_cache.peek(date)
+        if cached is not None:
+            self._show_entries(cached, reset_scroll)
+            self._update_sidebar()
+            reset_scroll = False
+        elif reset_scroll:
+            self.empty_label.configure(text="Loading...")
+            self._show_entries([], True)
 
-        # Vertical separator
-        sep = tk.Frame(row, bg=BORDER, width=1)
-        sep.pack(side="left", fill="y", padx=(0, 8))
-
-        # Card with mood accent stripe
-        mood = entry.get("mood")
-        mood_color = MOOD_COLORS.get(mood, BORDER) if mood else BORDER
-
-        card_outer = tk.Frame(row, bg=mood_color, padx=0, pady=0)
-        card_outer.pack(side="left", fill="x", expand=True)
+        def worker():
+            manifest = self._read_manifest()
+            entries = self.day_cache.load(date)
+            try:
+                self.root.after(0, lambda: self._on_day_loaded(
+                    token, date, manifest, entries, reset_scroll, follow_manifest))
+            except RuntimeError:
+                pass
 
-        # Left accent stripe
-        accent_stripe = tk.Frame(card_outer, bg=mood_color, width=3)
-        accent_stripe.pack(side="left", fill="y")
+        threading.Thread(target=worker, daemon=True).start()
 
-        # Card border
-        card_border = tk.Frame(card_outer, bg=BORDER, padx=1, pady=1)
-        card_border.pack(side="left", fill="x", expand=True)
+    def _on_day_loaded(self, token, date, manifest, entries, reset_scroll, follow_manifest):
+        if token != self._load_token:
+            return  # superseded by a later navigation
 
-        card = tk.Frame(card_border, bg=CARD_BG, padx=10, pady=8)
-        card.pack(fill="x", expand=True)
+        self.manifest = manifest
+        dates = sorted([m["date"] for m in manifest], reverse=True)
+        if dates:
+            self.date_menu.configure(values=dates)
+            if follow_manifest and date not in dates:
+                self.current_date = dates[0]
+                self.date_var.set(self.current_date)
+                self.load_timeline(reset_scroll=False)
+                return
 
-        # Mood badge
-        if entry.get("type") == "mood" and mood:
-            emoji = MOOD_EMOJI.get(mood, "\U0001f4ad")
-            mood_badge = tk.Label(card, text=f"{emoji} {mood}",
-                                  font=(self.font_family, 10, "bold"),
-                                  bg=CARD_BG, fg=mood_color)
-            mood_badge.pack(anchor="w", pady=(0, 4))
+        # Posts confirmed before this load began are in what it read
+        self.outbox = [p for p in self.outbox if p["confirmed"] is None or p["confirmed"] > token]
+        self.empty_label.configure(text="No entries for this day.")
+        self._show_entries(entries, reset_scroll)
+        self._update_sidebar()
+        self._prefetch_neighbors()
+
+    def _show_entries(self, entries, reset_scroll):
+        self.day_entries = entries
+        self.shown_date = self.current_date
+        entries = self._with_pending(entries)
+        if reset_scroll:
+            self.entries = list(entries)
+            self._render_entries(reset_scroll=True)
+        else:
+            self._apply_entries(entries)
 
-        # Reply preview
-        if entry.get("type") == "reply" and entry.get("replyTo"):
-            reply_text = f"\u21b3 replying to {entry['replyTo']}"
-            tk.Label(card, text=reply_text, font=(self.font_family, 9),
-                     bg=CARD_BG, fg=MUTED).pack(anchor="w", pady=(0, 2))
+    def _prefetch_neighbors(self):
+        """Parse the previous and next manifest days in the background."""
+        dates = sorted([m["date"] for m in self.manifest])
+        if self.current_date not in dates:
+            return
+        idx = dates.index(self.current_date)
+        neighbors = [dates[i] for i in (idx - 1, idx + 1) if 0 <= i < len(dates)]
 
-        # Content
-        content = entry.get("content", "")
-        if content:
-            content_lbl = tk.Label(card, text=content, font=(self.font_family, 11),
-                                   bg=CARD_BG, fg=TEXT, wraplength=500, justify="left",
-                                   anchor="w")
-            content_lbl.pack(anchor="w", fill="x")
+        def worker():
+            for date in neighbors:
+                self.day_cache.load(date)
 
-        # Links
-        for link in entry.get("links", []):
-            link_text = f"\U0001f517 {link.get('title', link.get('url', ''))}"
-            link_lbl = tk.Label(card, text=link_text, font=(self.font_family, 10),
-                                bg=CARD_BG, fg=LINK_CLR, cursor="hand2", anchor="w")
-            link_lbl.pack(anchor="w", pady=(2, 0))
-            url = link.get("url", "")
-            if url:
-                link_lbl.bind("<Button-1>", lambda e, u=url: webbrowser.open(u))
+        threading.Thread(target=worker, daemon=True).start()
 
-        # Attachments
-        for att in entry.get("attachments", []):
-            att_type = att.get("type", "")
-            if att_type == "gif" or att_type == "image":
-                att_text = f"\U0001f3ac GIF: {att.get('url', '')[:50]}"
-            elif att_type == "pdf":
-                att_text = f"\U0001f4c4 {att.get('title', 'PDF')}"
+    def poster_image(self, url):
+        """PhotoImage for a mirrored GIF's poster frame, or None."""
+        if not url or not url.startswith("assets/"):
+            return None
+        if url in self.posters:
+            self.posters.move_to_end(url)
+            return self.posters[url]
+        try:
+            img = tk.PhotoImage(file=str(SCRIPT_DIR / url))
+        except (tk.TclError, OSError):
+            return None
+        factor = -(-img.width() // POSTER_WIDTH)
+        if factor > 1:
+            img = img.subsample(factor)
+        self.posters[url] = img
+        if len(self.posters) > POSTER_CACHE_SIZE:
+            self.posters.popitem(last=False)
+        return img
+
+    def _render_entries(self, reset_scroll=False):
+        for card in self.visible_cards.values():
+            card.entry = None
+        if reset_scroll:
+            self.row_heights = {}
+        self._recompute_offsets()
+        if reset_scroll:
+            self.timeline_canvas.yview_moveto(0)
+        self._layout_visible()
+
+    def _apply_entries(self, new_entries):
+        """Diff new_entries against the timeline by ID and re-render only what changed.
+
+        Unchanged entries keep their dict (so their bound cards are left alone),
+        edited ones lose their measured height, removed ones free their card.
+        Returns False when there was nothing to do.
+        """
+        old = {e.get("id"): e for e in self.entries}
+        changed = len(new_entries) != len(self.entries)
+        merged = []
+        for i, entry in enumerate(new_entries):
+            eid = entry.get("id")
+            prev = old.pop(eid, None)
+            if prev is not None and prev == entry:
+                merged.append(prev)
+                changed = changed or self.entries[i] is not prev
             else:
-                att_text = f"Attachment: {att.get('url', '')[:50]}"
-            tk.Label(card, text=att_text, font=(self.font_family, 9),
-                     bg=CARD_BG, fg=MUTED, anchor="w").pack(anchor="w", pady=(2, 0))
-
-        # Bottom row: tags + ID
-        bottom = tk.Frame(card, bg=CARD_BG)
-        bottom.pack(fill="x", pady=(4, 0))
-
-        if entry.get("tags"):
-            for tag in entry["tags"]:
-                pill = tk.Label(bottom, text=f"#{tag}", font=(self.font_family, 9),
-                                bg=TAG_BG, fg=MUTED, padx=4, pady=1, relief="solid", borderwidth=1)
-                pill.pack(side="left", padx=(0, 4))
-
-        # Entry ID (clickable -> edit mode)
-        eid = entry.get("id", "")
-        id_label = tk.Label(bottom, text=eid, font=(self.font_family, 9),
-                            bg=CARD_BG, fg=MUTED, cursor="hand2")
-        id_label.pack(side="right")
-        id_label.bind("<Button-1>", lambda e, ent=entry: self._show_entry_menu(e, ent))
+                self.row_heights.pop(eid, None)
+                merged.append(entry)
+                changed = True
+        for eid in old:
+            self.row_heights.pop(eid, None)
+        if not changed:
+            return False
+
+        self.entries = merged
+        self._recompute_offsets()
+        self._layout_visible()
+        return True
+
+    def _recompute_offsets(self):
+        offsets = [0]
+        total = 0
+        for entry in self.entries:
+            total += self.row_heights.get(entry.get("id"), CARD_ESTIMATE)
+            offsets.append(total)
+        self.row_offsets = offsets
+        width = self.timeline_canvas.winfo_width()
+        self.timeline_canvas.configure(scrollregion=(0, 0, width, max(total, 1)))
+
+    def _schedule_layout(self):
+        if not self._layout_pending:
+            self._layout_pending = True
+            self.root.after_idle(self._layout_visible)
+
+    def _layout_visible(self):
+        """Bind pooled cards to the rows in (and around) the viewport.
+
+        Cards are keyed by entry ID, so an insert or delete above the viewport
+        only moves the existing cards instead of rebinding all of them.
+        """
+        self._layout_pending = False
+        canvas = self.timeline_canvas
+        n = len(self.entries)
+
+        if not n:
+            for eid in list(self.visible_cards):
+                self._release_card(eid)
+            canvas.itemconfigure(self.empty_window, state="normal")
+            return
+        canvas.itemconfigure(self.empty_window, state="hidden")
+
+        top = canvas.canvasy(0)
+        bottom = top + canvas.winfo_height()
+        offsets = self.row_offsets
+        first = min(max(bisect_right(offsets, top - OVERSCAN) - 1, 0), n - 1)
+        last = min(max(bisect_left(offsets, bottom + OVERSCAN), first + 1), n)
+        wanted = {self.entries[idx].get("id"): idx for idx in range(first, last)}
+
+        for eid in list(self.visible_cards):
+            if eid not in wanted:
+                self._release_card(eid)
+
+        for eid, idx in wanted.items():
+            card = self.visible_cards.get(eid)
+            if card is None:
+                card = self.free_cards.pop() if self.free_cards else EntryCard(self, canvas)
+                self.visible_cards[eid] = card
+            if card.entry is not self.entries[idx]:
+                card.bind(self.entries[idx])
+            canvas.coords(card.window, 0, offsets[idx])
+            canvas.itemconfigure(card.window, state="normal")
+
+        # Measure the bound cards; estimates are replaced by real heights
+        canvas.update_idletasks()
+        changed = False
+        for eid, card in self.visible_cards.items():
+            height = card.row.winfo_reqheight() + CARD_GAP
+            if self.row_heights.get(eid) != height:
+                self.row_heights[eid] = height
+                changed = True
+        if changed:
+            self._recompute_offsets()
+            for eid, card in self.visible_cards.items():
+                canvas.coords(card.window, 0, self.row_offsets[wanted[eid]])
+
+    def _release_card(self, eid):
+        card = self.visible_cards.pop(eid)
+        self.timeline_canvas.itemconfigure(card.window, state="hidden")
+        self.free_cards.append(card)
 
     def _show_entry_menu(self, event, entry):
         """Show context menu on entry ID click."""
         menu = tk.Menu(self.root, tearoff=0, font=(self.font_family, 10),
                        bg=CARD_BG, fg=TEXT)
+        if entry.get("_pending"):
+            item = next((p for p in self.outbox if p["entry"]["id"] == entry["id"]), None)
+            if item is None:
+                return
+            if entry["_pending"] == "failed":
+                menu.add_command(label=entry.get("_error", "")[:80], state="disabled")
+                menu.add_command(label="Retry post", command=lambda: self._send(item))
+                menu.add_command(label="Discard post", command=lambda: self._discard(item))
+            else:
+                menu.add_command(label="Sending\u2026", state="disabled")
+            menu.tk_popup(event.x_root, event.y_root)
+            return
         menu.add_command(label=f"Edit {entry['id']}", command=lambda: self.enter_edit_mode(entry))
         menu.add_command(label=f"Delete {entry['id']}", command=lambda: self.do_delete(entry['id']))
         menu.add_separator()
@@ -752,34 +1198,42 @@ class WhatsUpGUI:
 
     # ── CLI runner ───────────────────────────────────────────────────
 
-    def run_cli_async(self, args, callback):
-        """Run ./whatsup with args in a background thread, then invoke callback on main thread."""
-        def worker():
+    @staticmethod
+    def _run_cli(args):
+        """Run ./whatsup with args; returns (ok, stdout, stderr)."""
+        # A running whatsup daemon answers without starting a process
+        result = daemon.run_cli(args)
+        if result is not None:
+            return result
+        try:
+            cmd = ["bash", str(SCRIPT_DIR / "whatsup")] + args
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30,
+                                    cwd=str(SCRIPT_DIR))
+            return (result.returncode == 0, result.stdout, result.stderr)
+        except subprocess.TimeoutExpired:
+            return (False, "", "Command timed out (30s)")
+        except Exception as e:
+            return (False, "", str(e))
+
+    def _submit(self, work, callback):
+        """Run work() on the writer thread, then callback(*its result) on the main thread."""
+        def job():
+            result = work()
             try:
-                cmd = ["bash", str(SCRIPT_DIR / "whatsup")] + args
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30,
-                                        cwd=str(SCRIPT_DIR))
-                self.root.after(0, lambda: callback(
-                    result.returncode == 0, result.stdout, result.stderr))
-            except subprocess.TimeoutExpired:
-                self.root.after(0, lambda: callback(False, "", "Command timed out (30s)"))
-            except Exception as e:
-                self.root.after(0, lambda: callback(False, "", str(e)))
+                self.root.after(0, lambda: callback(*result))
+            except RuntimeError:
+                pass   # window closed
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.writer.submit(job)
+
+    def run_cli_async(self, args, callback):
+        """Run ./whatsup with args behind any queued writes, then invoke callback on main thread."""
+        self._submit(lambda: self._run_cli(args), callback)
 
     # ── Refresh ──────────────────────────────────────────────────────
 
     def refresh(self):
-        self._load_manifest()
-        # Update date dropdown values
-        dates = sorted([m["date"] for m in self.manifest], reverse=True) if self.manifest else []
-        if dates:
-            self.date_menu.configure(values=dates)
-            if self.current_date not in dates:
-                self.current_date = dates[0]
-                self.date_var.set(self.current_date)
-        self.load_timeline()
+        self.load_timeline(reset_scroll=False, follow_manifest=True)
 
     # ── Status bar ───────────────────────────────────────────────────
 
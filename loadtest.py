@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Load generator for webgui.py.
+
+Replays a weighted mix of reads (/api/manifest, /api/entries, static
+files) and writes (/api/post, /api/edit, /api/delete) at a fixed request
+rate and reports throughput, error rate, the share of requests shed by
+admission control (429/503) and latency percentiles per route:
+
+    python3 loadtest.py --rate 200 --duration 30 \\
+        --mix manifest=40,entries=35,static=15,post=6,edit=3,delete=1
+
+Without --url it runs fully offline: it generates a timeline repo with
+--days days of --per-day entries in a temporary directory, gives it a
+local bare repository as its git remote (--push-delay makes that remote
+slow, through a pre-receive hook), and serves it from an in-process web
+GUI at /t/load/, written in-process and committed by a background
+syncer exactly like a hosted timeline. --keep leaves the directory.
+
+Requests are scheduled open-loop: each has a due time fixed by the rate,
+and its latency is measured from that time, so a stalled server shows up
+as latency (instead of silently lowering the offered load). Workers are
+a thread pool (--concurrency) issuing one HTTP/1.1 request at a time.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import days
+import feeds
+import storage
+import timeline
+
+ROUTES = ("manifest", "entries", "static", "post", "edit", "delete")
+DEFAULT_MIX = "manifest=40,entries=35,static=15,post=6,edit=3,delete=1"
+STATIC_PATHS = ("style.css", "data/index.json", "feed.xml")
+WORDS = ("pipeline", "coffee", "review", "deploy", "notebook", "meeting", "refactor",
+         "benchmark", "lunch", "paper", "figure", "draft", "bug", "release", "run")
+MOODS = ("focused", "happy", "tired", "excited", "chill", "thinking", None, None, None)
+
+
+# ── Offline fixture ──
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def generate(base, n_days, per_day, push_delay=0.0, seed=1):
+    """A timeline repo at base/timelines/load with a bare remote at base/remote.git."""
+    rng = random.Random(seed)
+    root = os.path.join(base, "timelines", "load")
+    entries_dir = os.path.join(root, "data", "entries")
+    os.makedirs(entries_dir)
+    with open(os.path.join(root, "config.json"), "w") as f:
+        json.dump({"name": "Load test", "bio": "Generated by loadtest.py", "timezone": "UTC"}, f, indent=2)
+
+    manifest = []
+    start = datetime.now(timezone.utc).replace(hour=8, minute=0, second=0, microsecond=0)
+    for d in range(n_days):
+        day = start - timedelta(days=n_days - 1 - d)
+        entries = []
+        for i in range(per_day):
+            ts = day + timedelta(minutes=i * (600 // max(per_day, 1)))
+            mood = rng.choice(MOODS)
+            entries.append(storage.expand({
+                "id": f"{rng.getrandbits(32):08x}",
+                "ts": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "type": "mood" if mood else "post",
+                "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20))),
+                "mood": mood,
+                "tags": rng.sample(WORDS, rng.randint(0, 2)),
+            }))
+        date = day.strftime("%Y-%m-%d")
+        with open(os.path.join(entries_dir, f"{date}.json"), "w") as f:
+            f.write(storage.dumps(entries))
+        manifest.append(days.day_record(date, entries, timezone.utc))
+    manifest.sort(key=lambda m: m["date"], reverse=True)
+    with open(os.path.join(root, "data", "index.json"), "w") as f:
+        f.write(storage.dumps_manifest(manifest))
+    # Served as static files from the start, not only after the first post
+    feeds.update(timeline.Timeline(root))
+
+    remote = os.path.join(base, "remote.git")
+    _git(base, "init", "-q", "--bare", remote)
+    if push_delay:
+        hook = os.path.join(remote, "hooks", "pre-receive")
+        with open(hook, "w") as f:
+            f.write(f"#!/bin/sh\nsleep {push_delay}\n")
+        os.chmod(hook, 0o755)
+    _git(root, "init", "-q")
+    _git(root, "config", "user.name", "loadtest")
+    _git(root, "config", "user.email", "loadtest@localhost")
+    _git(root, "add", "-A")
+    _git(root, "commit", "-q", "-m", "generated timeline")
+    _git(root, "remote", "add", "origin", remote)
+    _git(root, "push", "-q", "-u", "origin", "HEAD")
+    return root
+
+
+def serve(base, **host_opts):
+    """Start an in-process web GUI hosting base/timelines; returns (server, url).
+    host_opts go to its TimelineHost (write_queue, write_rate)."""
+    from http.server import ThreadingHTTPServer
+
+    import webgui
+
+    class QuietHandler(webgui.WhatsUpHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+    server.daemon_threads = True
+    server.host = webgui.TimelineHost(os.path.join(base, "timelines"), **host_opts)
+    server.host.start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/t/load/"
+
+
+# ── Workload ──
+
+class Workload:
+    """Builds requests for each route from what the timeline holds."""
+
+    def __init__(self, client, seed=2):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        status, body = client.request("GET", "api/manifest")
+        manifest = json.loads(body) if status == 200 else []
+        self.dates = [m["date"] for m in manifest] or [days.today(timezone.utc)]
+        self.ids = []
+        for date in self.dates[:8]:
+            status, body = client.request("GET", f"api/entries?date={date}")
+            if status == 200:
+                self.ids += [e["id"] for e in json.loads(body)]
+        self.created = 0
+
+    def _pick_id(self, remove=False):
+        with self.lock:
+            if not self.ids:
+                return None
+            i = self.rng.randrange(len(self.ids))
+            return self.ids.pop(i) if remove else self.ids[i]
+
+    def request(self, route):
+        """(method, path, body) for one request on route, or None if impossible."""
+        rng = self.rng
+        if route == "manifest":
+            return "GET", "api/manifest", None
+        if route == "entries":
+            return "GET", f"api/entries?date={rng.choice(self.dates)}", None
+        if route == "static":
+            return "GET", rng.choice(STATIC_PATHS), None
+        if route == "post":
+            with self.lock:
+                self.created += 1
+                n = self.created
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 16)))
+            return "POST", "api/post", {"content": f"load {n}: {text}", "mood": rng.choice(MOODS) or ""}
+        if route == "edit":
+            entry_id = self._pick_id()
+            return entry_id and ("POST", "api/edit", {"id": entry_id, "content": f"edited {rng.random():.6f}"})
+        if route == "delete":
+            entry_id = self._pick_id(remove=True)
+            return entry_id and ("POST", "api/delete", {"id": entry_id})
+        raise ValueError(route)
+
+    def observe(self, route, body):
+        """Learn the IDs of entries the run creates, for later edits and deletes."""
+        if route == "post":
+            try:
+                entry = json.loads(body).get("entry")
+            except ValueError:
+                return
+            if entry:
+                with self.lock:
+                    self.ids.append(entry["id"])
+
+
+class Client:
+    """One keep-alive HTTP connection per thread, reopened after errors."""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urllib.parse.urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path if parts.path.endswith("/") else parts.path + "/"
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        try:
+            conn.request(method, self.prefix + path, body=data, headers=headers)
+            resp = conn.getresponse()
+            payload = resp.read()
+            if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+                conn.close()
+                self.local.conn = None
+            return resp.status, payload
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route {name!r} in --mix (routes: {', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def run(client, workload, mix, rate, duration, concurrency):
+    """Drive the mix at rate req/s for duration seconds; returns per-route samples."""
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    samples = defaultdict(list)      # route -> [(latency, ok, shed)]
+    lock = threading.Lock()
+    total = int(rate * duration)
+    start = time.monotonic() + 0.1
+    next_index = iter(range(total))
+    index_lock = threading.Lock()
+    rng = random.Random(3)
+    plan = [rng.choices(routes, weights)[0] for _ in range(total)]
+
+    def worker():
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            due = start + i / rate
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            route = plan[i]
+            req = workload.request(route)
+            if req is None:
+                continue
+            method, path, body = req
+            ok = shed = False
+            try:
+                status, payload = client.request(method, path, body)
+                shed = status in (429, 503)
+                ok = status < 400
+                if ok and method == "POST":
+                    ok = json.loads(payload).get("ok", False)
+                    workload.observe(route, payload)
+            except (OSError, http.client.HTTPException, ValueError):
+                pass
+            latency = time.monotonic() - due
+            with lock:
+                samples[route].append((latency, ok, shed))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.monotonic() - t0
+
+
+def _pct(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, elapsed):
+    rows = {}
+    everything = []
+    for route in ROUTES + ("all",):
+        if route == "all":
+            data = everything
+        else:
+            data = samples.get(route, [])
+            everything += data
+        if not data:
+            continue
+        lat = sorted(l for l, _, _ in data)
+        errors = sum(1 for _, ok, shed in data if not ok and not shed)
+        shed = sum(1 for _, _, shed in data if shed)
+        rows[route] = {
+            "requests": len(data),
+            "errors": errors,
+            "error_rate": errors / len(data),
+            "shed": shed,
+            "shed_rate": shed / len(data),
+            "throughput": len(data) / elapsed if elapsed else 0.0,
+            "p50_ms": _pct(lat, 50) * 1000,
+            "p90_ms": _pct(lat, 90) * 1000,
+            "p99_ms": _pct(lat, 99) * 1000,
+            "max_ms": lat[-1] * 1000,
+        }
+    return rows
+
+
+def print_report(rows, elapsed, out=sys.stdout):
+    out.write(f"{'route':<10}{'reqs':>7}{'err%':>7}{'shed%':>7}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}\n")
+    for route, r in rows.items():
+        out.write(f"{route:<10}{r['requests']:>7}{100 * r['error_rate']:>7.1f}{100 * r['shed_rate']:>7.1f}"
+                  f"{r['throughput']:>9.1f}"
+                  f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}\n")
+    out.write(f"\n{elapsed:.1f}s elapsed\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the whatsup web GUI")
+    parser.add_argument("--url", help="timeline to test, e.g. http://localhost:9000/ "
+                                      "(default: a generated one served in-process)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--rate", type=float, default=100.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="client threads")
+    parser.add_argument("--days", type=int, default=365, help="days in the generated timeline")
+    parser.add_argument("--per-day", type=int, default=6, help="entries per generated day")
+    parser.add_argument("--push-delay", type=float, default=0.0,
+                        help="seconds each push to the generated remote takes")
+    parser.add_argument("--write-queue", type=int, help="the generated server's --write-queue")
+    parser.add_argument("--write-rate", type=float, default=0.0,
+                        help="the generated server's --write-rate (default 0, unlimited: "
+                             "all requests come from one client)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated repo")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    opts = parser.parse_args(argv)
+
+    mix = parse_mix(opts.mix)
+    base = server = None
+    url = opts.url
+    if not url:
+        base = tempfile.mkdtemp(prefix="whatsup-load-")
+        sys.stderr.write(f"Generating {opts.days} days x {opts.per_day} entries in {base}\n")
+        generate(base, opts.days, opts.per_day, opts.push_delay)
+        host_opts = {"write_rate": opts.write_rate}
+        if opts.write_queue is not None:
+            host_opts["write_queue"] = opts.write_queue
+        server, url = serve(base, **host_opts)
+    try:
+        client = Client(url)
+        workload = Workload(client)
+        sys.stderr.write(f"Offering {opts.rate:g} req/s for {opts.duration:g}s to {url}\n")
+        samples, elapsed = run(client, workload, mix, opts.rate, opts.duration, opts.concurrency)
+        rows = summarize(samples, elapsed)
+        if opts.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print_report(rows, elapsed)
+    finally:
+        if server is not None:
+            server.shutdown()
+            for site in list(server.host._sites.values()):
+                site.close()
+        if base and not opts.keep:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Opt-in local mirroring of --gif attachments.
+
+Downloads a remote GIF once, under a size cap, into the content-addressed
+asset store, and records its dimensions plus a single-frame poster so
+timelines no longer hot-link third-party media. The poster is cut from
+the GIF's own first frame (header, colour table and first image block),
+so no image library is needed.
+"""
+
+import re
+import struct
+import time
+import urllib.request
+
+import attachments
+
+MAX_BYTES = 8 * 1024 * 1024   # largest GIF that will be mirrored
+TIMEOUT = 10.0                # seconds for the whole download
+CHUNK_SIZE = 1 << 16
+USER_AGENT = "whatsup-mirror/1.0"
+
+
+class NotAGif(ValueError):
+    """The URL did not serve a GIF."""
+
+
+def giphy_direct(url):
+    """Turn a giphy.com/gifs/<slug>-<id> page URL into its media URL."""
+    if "media.giphy.com" in url or "/media/" in url:
+        return url
+    m = re.search(r"giphy\.com/gifs/[^/]+-([a-zA-Z0-9]+)/?$", url)
+    return f"https://media.giphy.com/media/{m.group(1)}/giphy.gif" if m else url
+
+
+def _download_chunks(resp, deadline):
+    first = True
+    while True:
+        if time.monotonic() > deadline:
+            raise TimeoutError("GIF download took too long")
+        chunk = resp.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        if first and not chunk.startswith((b"GIF87a", b"GIF89a")):
+            raise NotAGif("response is not a GIF")
+        first = False
+        yield chunk
+
+
+def gif_size(data):
+    """(width, height) from a GIF's logical screen descriptor."""
+    return struct.unpack("<HH", data[6:10])
+
+
+def _skip_sub_blocks(data, i):
+    while data[i]:
+        i += data[i] + 1
+    return i + 1
+
+
+def poster_frame(data):
+    """A still GIF holding only the first frame of data."""
+    flags = data[10]
+    i = 13
+    if flags & 0x80:
+        i += 3 << ((flags & 0x07) + 1)
+    out = [data[:i]]
+    control = b""
+    while i < len(data):
+        block = data[i]
+        if block == 0x21:                       # extension
+            end = _skip_sub_blocks(data, i + 2)
+            if data[i + 1] == 0xF9:             # keep graphic control (transparency)
+                control = data[i:end]
+            i = end
+        elif block == 0x2C:                     # image descriptor
+            start = i
+            local = data[i + 9]
+            i += 10
+            if local & 0x80:
+                i += 3 << ((local & 0x07) + 1)
+            i = _skip_sub_blocks(data, i + 1)   # LZW code size, then image data
+            out += [control, data[start:i]]
+            break
+        else:
+            break
+    out.append(b";")
+    return b"".join(out)
+
+
+def mirror(url, root=".", max_bytes=MAX_BYTES, timeout=TIMEOUT):
+    """Fetch url into the asset store and return the attachment fields."""
+    source = giphy_direct(url)
+    deadline = time.monotonic() + timeout
+    req = urllib.request.Request(source, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        length = resp.headers.get("Content-Length")
+        if length and int(length) > max_bytes:
+            raise attachments.TooLarge(f"GIF is {length} bytes (limit {max_bytes})")
+        stored = attachments.store_chunks(_download_chunks(resp, deadline), ".gif", root, max_bytes)
+
+    with open(f"{root}/{stored['url']}", "rb") as f:
+        data = f.read()
+    width, height = gif_size(data)
+    poster = attachments.store_chunks([poster_frame(data)], ".gif", root)
+    return {"url": stored["url"], "source": url, "width": width, "height": height,
+            "poster": poster["url"], "sha256": stored["sha256"], "size": stored["size"]}
@@ -0,0 +1,197 @@
+"""Append-only operation log for whatsup.
+
+Every change to the timeline is appended to the repo's
+.git/whatsup-ops.log as one compact JSON line with an increasing sequence
+number:
+
+    {"seq": 12, "at": "...Z", "op": "edit", "id": "ab12cd34",
+     "date": "2026-03-18", "entry": {...}, "prev": {...}}
+
+post records the new entry, edit records the new and previous versions
+and delete records what was removed, so any op can be reversed from its
+own line. rebucket records a "move" per entry it re-files, with the old
+date in "from". Ops written by an undo carry "undoes": <seq>. Lines are
+in seq order, so readers that remember the last seq they saw can seek
+straight to what is new with since().
+
+The log holds the text of deleted and edited entries, so it is kept out
+of the published tree. Older versions kept it at data/ops.log; that copy
+is read until the first write moves it (see adopt()).
+"""
+
+import fcntl
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+LOG_NAME = "whatsup-ops.log"
+LEGACY_PATH = "data/ops.log"   # where older versions published the log
+TAIL_CHUNK = 1 << 14
+
+
+def log_path(root="."):
+    root = Path(root)
+    git_dir = root / ".git"
+    return git_dir / LOG_NAME if git_dir.is_dir() else root / f".{LOG_NAME}"
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _seq_of(line):
+    try:
+        return json.loads(line)["seq"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class OpLog:
+    def __init__(self, path, legacy=None):
+        self.path = str(path)
+        self.legacy = str(legacy) if legacy else None
+
+    def _source(self):
+        """The file to read: the log, or a published one not adopted yet."""
+        if self.legacy and not os.path.exists(self.path) and os.path.exists(self.legacy):
+            return self.legacy
+        return self.path
+
+    # ── Writing ──
+
+    def adopt(self):
+        """Move an older version's published log to path. Returns True if
+        there was one, so the caller can commit its removal."""
+        if not self.legacy or not os.path.exists(self.legacy):
+            return False
+        if os.path.exists(self.path):
+            # The local log already continues it; git history keeps the rest
+            os.unlink(self.legacy)
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            os.replace(self.legacy, self.path)
+        return True
+
+    def append(self, op, entry_id, date, **fields):
+        """Append one op (fields such as entry, prev, undoes, from) and
+        return its record."""
+        rec = {"seq": 0, "at": _now(), "op": op, "id": entry_id, "date": date}
+        rec.update((k, v) for k, v in fields.items() if v is not None)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            last = self._last(fd)
+            rec["seq"] = (last["seq"] if last else 0) + 1
+            os.write(fd, (json.dumps(rec, separators=(",", ":")) + "\n").encode())
+        finally:
+            os.close(fd)
+        return rec
+
+    # ── Reading ──
+
+    def _reverse_lines(self, fd):
+        """Complete lines from the end of the file backwards."""
+        end = os.lseek(fd, 0, os.SEEK_END)
+        tail = b""
+        while end > 0:
+            start = max(0, end - TAIL_CHUNK)
+            chunk = os.pread(fd, end - start, start) + tail
+            end = start
+            lines = chunk.split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+    def _last(self, fd):
+        for line in self._reverse_lines(fd):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue  # torn write at the end; the line before is intact
+        return None
+
+    def reverse(self):
+        """Yield records newest first."""
+        try:
+            fd = os.open(self._source(), os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            for line in self._reverse_lines(fd):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        finally:
+            os.close(fd)
+
+    def last_seq(self):
+        for rec in self.reverse():
+            return rec["seq"]
+        return 0
+
+    def since(self, seq=0):
+        """Yield records with seq greater than the given one, oldest first.
+
+        The start is found by bisecting byte offsets, so catching up costs
+        a few seeks plus the new lines rather than a read of the whole log.
+        """
+        try:
+            f = open(self._source(), "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            # lo only ever moves past lines known to be <= seq
+            lo, hi = 0, os.fstat(f.fileno()).st_size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid)
+                if mid:
+                    f.readline()
+                pos = f.tell()
+                line = f.readline() if pos < hi else b""
+                found = _seq_of(line) if line else None
+                if found is not None and found <= seq:
+                    lo = pos + len(line)
+                else:
+                    hi = mid
+            f.seek(lo)
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("seq", 0) > seq:
+                    yield rec
+
+    def undoable(self):
+        """The newest record that is not an undo and has not been undone."""
+        undone = set()
+        for rec in self.reverse():
+            if "undoes" in rec:
+                undone.add(rec["undoes"])
+            elif rec["seq"] not in undone and rec["op"] in ("post", "edit", "delete"):
+                return rec
+        return None
+
+    def history(self, entry_id):
+        """Every record for entry_id, oldest first."""
+        needle = f'"id":{json.dumps(entry_id)}'.encode()
+        try:
+            f = open(self._source(), "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                if needle in line:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if rec.get("id") == entry_id:
+                        yield rec
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Publishing whatsup commits to one or more git remotes.
+
+config.json's "publish" lists the targets; without it the only target is
+a plain `git push`, as always:
+
+    "publish": [
+      "origin",
+      {"remote": "mirror", "branch": "main", "timeout": 20, "retries": 3},
+      {"name": "intranet", "remote": "/srv/git/whatsup.git"}
+    ]
+
+The first target is the primary: commit() pushes to it in the
+foreground, with its own timeout and retries. The others are mirrors,
+pushed concurrently by a detached `python3 publish.py mirrors`, so a
+slow or unreachable mirror never holds up the primary or the command.
+Pushes to one remote are serialized by a lock file and always send the
+current HEAD, so a mirror that falls behind catches up in one push.
+
+Each push records its outcome in .git/whatsup-publish.json (last attempt,
+last success, the commit pushed, the last error), which
+`./whatsup --publish-status` reads to show how far each remote lags.
+"""
+
+import fcntl
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+STATUS_NAME = "whatsup-publish.json"
+TIMEOUT = 60.0       # seconds for one push attempt
+RETRIES = 2          # further attempts after a failed push
+RETRY_DELAY = 2.0    # seconds before the first retry, doubling after each
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def targets(config):
+    """Publish targets from config, primary first."""
+    raw = (config or {}).get("publish") or [{"name": "default", "remote": None}]
+    out = []
+    for t in raw:
+        if isinstance(t, str):
+            t = {"remote": t}
+        out.append({
+            "name": t.get("name") or t.get("remote") or "default",
+            "remote": t.get("remote"),
+            "branch": t.get("branch"),
+            "timeout": float(t.get("timeout", TIMEOUT)),
+            "retries": int(t.get("retries", RETRIES)),
+        })
+    return out
+
+
+def load_targets(root="."):
+    try:
+        return targets(json.loads(Path(root, "config.json").read_text()))
+    except (OSError, ValueError):
+        return targets({})
+
+
+def _git_dir(root):
+    return Path(root, ".git")
+
+
+@contextmanager
+def _locked(path, blocking=True):
+    with open(path, "a+") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield None
+            return
+        yield f
+
+
+def _lock_path(root, name):
+    return _git_dir(root) / f"whatsup-publish-{re.sub(r'[^A-Za-z0-9._-]', '_', name)}.lock"
+
+
+def read_status(root="."):
+    try:
+        return json.loads((_git_dir(root) / STATUS_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _record(root, name, **fields):
+    path = _git_dir(root) / STATUS_NAME
+    with _locked(f"{path}.lock"):
+        status = read_status(root)
+        status.setdefault(name, {}).update(fields)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(status, indent=2))
+        os.replace(tmp, path)
+
+
+def _head(root):
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _summary(output):
+    """The line of git's output that says what went wrong."""
+    lines = [l.strip() for l in output.splitlines() if l.strip()]
+    for l in lines:
+        if l.startswith(("fatal:", "error:", "! ")):
+            return l
+    return lines[-1] if lines else "push failed"
+
+
+def push_target(root, target):
+    """Push HEAD to one target, retrying on failure. Returns (ok, output)."""
+    name = target["name"]
+    cmd = ["git", "push"]
+    if target["remote"]:
+        cmd.append(target["remote"])
+        cmd.append(f"HEAD:refs/heads/{target['branch']}" if target["branch"] else "HEAD")
+    with _locked(_lock_path(root, name)):
+        head = _head(root)
+        if head and read_status(root).get(name, {}).get("pushed") == head:
+            return True, ""   # a push that waited on the same lock already sent it
+        output = ""
+        for attempt in range(target["retries"] + 1):
+            if attempt:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+            _record(root, name, lastAttempt=_now())
+            try:
+                result = subprocess.run(cmd, cwd=root, capture_output=True, text=True,
+                                        timeout=target["timeout"])
+                output = result.stdout + result.stderr
+                ok = result.returncode == 0
+            except subprocess.TimeoutExpired:
+                output, ok = f"push to {name} timed out after {target['timeout']:g}s\n", False
+            if ok:
+                _record(root, name, lastSuccess=_now(), pushed=head, error=None, failures=0)
+                return True, output
+            failures = read_status(root).get(name, {}).get("failures", 0) + 1
+            _record(root, name, error=_summary(output), failures=failures)
+        return False, output
+
+
+def push_mirrors(root="."):
+    """Push every mirror target concurrently and wait for them."""
+    threads = [threading.Thread(target=push_target, args=(root, t)) for t in load_targets(root)[1:]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def push(root=".", capture=False):
+    """Start the mirrors in the background, then push the primary target.
+
+    Returns (ok, output) for the primary push.
+    """
+    all_targets = load_targets(root)
+    if len(all_targets) > 1:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "mirrors"], cwd=root,
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+    ok, output = push_target(root, all_targets[0])
+    if not capture and output:
+        sys.stderr.write(output)
+    return ok, output
+
+
+def _ago(ts):
+    if not ts:
+        return "never"
+    s = int((datetime.now(timezone.utc) - datetime.fromisoformat(ts.replace("Z", "+00:00"))).total_seconds())
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if s >= size:
+            return f"{s // size}{unit} ago"
+    return f"{s}s ago"
+
+
+def status_lines(root="."):
+    """One line per target: commits behind HEAD, last success, last error."""
+    head = _head(root)
+    status = read_status(root)
+    lines = []
+    for i, t in enumerate(load_targets(root)):
+        st = status.get(t["name"], {})
+        pushed = st.get("pushed")
+        if not pushed:
+            lag = "never pushed"
+        elif pushed == head:
+            lag = "up to date"
+        else:
+            count = subprocess.run(["git", "rev-list", "--count", f"{pushed}..HEAD"], cwd=root,
+                                   capture_output=True, text=True).stdout.strip() or "?"
+            lag = f"{count} commit{'' if count == '1' else 's'} behind"
+        with _locked(_lock_path(root, t["name"]), blocking=False) as free:
+            busy = ", pushing now" if free is None else ""
+        role = "primary" if i == 0 else "mirror"
+        where = t["remote"] or "(upstream)"
+        line = f"  {t['name']:<12} {role:<8} {lag}{busy}; last success {_ago(st.get('lastSuccess'))} -> {where}"
+        if st.get("error") and st.get("failures"):
+            line += f"\n               last error ({st['failures']} failed): {st['error']}"
+        lines.append(line)
+    return lines
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["mirrors"]:
+        push_mirrors(".")
+    else:
+        sys.exit("usage: publish.py mirrors")
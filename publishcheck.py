@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""End-to-end check of publishing to several remotes, against local bare
+repositories.
+
+Builds a scratch repo whose config.json publishes to three targets: a
+primary, a mirror whose pre-receive hook sleeps --mirror-delay seconds,
+and a mirror that does not exist. It then commits through gitsync, as
+every whatsup write does, and checks that:
+
+  - the commit returns once the primary has it, without waiting for the
+    slow mirror;
+  - --publish-status shows the slow mirror being pushed meanwhile;
+  - the slow mirror ends up with the same HEAD;
+  - the missing mirror records its failure, and the others no error.
+
+    python3 publishcheck.py [--mirror-delay 3] [--keep]
+
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import gitsync
+import publish
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def setup(base, mirror_delay):
+    """A repo at base/repo publishing to base/primary.git, base/slow.git and base/missing.git."""
+    root = os.path.join(base, "repo")
+    primary, slow = os.path.join(base, "primary.git"), os.path.join(base, "slow.git")
+    for remote in (primary, slow):
+        _git(base, "init", "-q", "--bare", remote)
+    hook = os.path.join(slow, "hooks", "pre-receive")
+    with open(hook, "w") as f:
+        f.write(f"#!/bin/sh\nsleep {mirror_delay}\n")
+    os.chmod(hook, 0o755)
+
+    os.makedirs(root)
+    _git(root, "init", "-q")
+    _git(root, "config", "user.name", "publishcheck")
+    _git(root, "config", "user.email", "publishcheck@localhost")
+    with open(os.path.join(root, "config.json"), "w") as f:
+        json.dump({"publish": [
+            {"name": "primary", "remote": primary, "branch": "main"},
+            {"name": "slow", "remote": slow, "branch": "main", "timeout": mirror_delay + 30},
+            {"name": "missing", "remote": os.path.join(base, "missing.git"), "retries": 0},
+        ]}, f, indent=2)
+    return root, primary, slow
+
+
+def _head_of(remote):
+    try:
+        return _git(remote, "rev-parse", "refs/heads/main")
+    except subprocess.CalledProcessError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check publishing to a primary and mirror remotes")
+    parser.add_argument("--mirror-delay", type=float, default=3.0,
+                        help="seconds each push to the slow mirror takes")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    opts = parser.parse_args(argv)
+
+    base = tempfile.mkdtemp(prefix="whatsup-publish-")
+    failures = []
+
+    def check(ok, what):
+        print(f"{'ok  ' if ok else 'FAIL'}  {what}")
+        if not ok:
+            failures.append(what)
+
+    try:
+        root, primary, slow = setup(base, opts.mirror_delay)
+        started = time.monotonic()
+        ok, output = gitsync.commit(["config.json"], "publishcheck: first commit", root=root, capture=True)
+        took = time.monotonic() - started
+        head = _git(root, "rev-parse", "HEAD")
+        check(ok, "commit and primary push succeed")
+        check(_head_of(primary) == head, "primary has HEAD")
+        check(took < opts.mirror_delay, f"commit returned in {took:.1f}s, before the slow mirror "
+                                        f"({opts.mirror_delay:g}s)")
+
+        time.sleep(0.5)
+        check(any("slow" in l and "pushing now" in l for l in publish.status_lines(root)),
+              "status shows the slow mirror being pushed")
+
+        deadline = time.monotonic() + opts.mirror_delay + 30
+        while _head_of(slow) != head and time.monotonic() < deadline:
+            time.sleep(0.2)
+        check(_head_of(slow) == head, "slow mirror catches up with HEAD")
+
+        # The missing mirror fails fast, but wait for its record all the same
+        while "error" not in publish.read_status(root).get("missing", {}) and time.monotonic() < deadline:
+            time.sleep(0.2)
+        status = publish.read_status(root)
+        check(bool(status.get("missing", {}).get("error")), "missing mirror records its error")
+        check(not status.get("primary", {}).get("error") and not status.get("slow", {}).get("error"),
+              "primary and slow mirror record no error")
+
+        print()
+        for line in publish.status_lines(root):
+            print(line)
+    finally:
+        if opts.keep:
+            sys.stderr.write(f"Kept {base}\n")
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""SQLite storage backend for whatsup.
+
+Selected with "backend": "sqlite" in config.json. Entries live in a
+SQLite database (WAL mode) next to the repo's git metadata, with tables
+for entries, their tags and attachments and a full-text index, so ID
+lookups, date ranges, tag/mood/type filters, searches and the manifest's
+per-day counts are indexed queries instead of file scans.
+
+The JSON day files stay what gets published and committed. A write only
+marks its day dirty in the database; flush(), which timeline.run() calls
+before handing changes to git, exports just the dirty days and
+data/index.json. The database records the (mtime, size) of every day
+file it exported or imported, and days whose files changed behind its
+back (a git pull, the other backend, a manual edit) are re-imported, at
+most once every SYNC_INTERVAL seconds.
+
+The full-text index uses FTS5's trigram tokenizer where SQLite has it,
+which matches substrings like --grep does; otherwise searches fall back
+to LIKE on the same text, or (since LIKE ignores case only for ASCII) to
+the caller's own match for non-ASCII text.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import days
+import storage
+import timeline
+
+DB_NAME = "whatsup.db"
+SYNC_INTERVAL = 1.0   # seconds between checks of data/entries for outside changes
+PAGE_SIZE = 256       # rows fetched per query() round trip
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    type TEXT,
+    mood TEXT,
+    reply_to TEXT,
+    search TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_date ON entries (date, ts);
+CREATE TABLE IF NOT EXISTS tags (
+    entry_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (entry_id, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_by_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS attachments (
+    entry_id TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    type TEXT,
+    url TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    PRIMARY KEY (entry_id, pos)
+);
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY,
+    sig TEXT,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def db_path(root="."):
+    root = Path(root)
+    git_dir = root / ".git"
+    return str(git_dir / DB_NAME if git_dir.is_dir() else root / f".{DB_NAME}")
+
+
+def _sig(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _like(text):
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class SqliteTimeline(timeline.Timeline):
+    """A Timeline whose reads and writes go through SQLite."""
+
+    def __init__(self, root=".", index_ids=False, cache_days=timeline.DAY_CACHE_SIZE):
+        # IDs are the primary key, so the in-memory ID index is never needed
+        super().__init__(root, cache_days=cache_days)
+        self.db = sqlite3.connect(db_path(root), check_same_thread=False,
+                                  isolation_level=None, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                            "USING fts5(search, tokenize='trigram')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self._synced = 0.0
+        self._manifest_key = None
+        with self.lock:
+            # Days a crash left unexported win over their old files
+            self.flush()
+            self._sync()
+
+    # ── Reads ──
+
+    def manifest(self):
+        with self.lock:
+            self._fresh()
+            key = (self.db.execute("PRAGMA data_version").fetchone()[0], self.db.total_changes)
+            if key != self._manifest_key:
+                tz = self.tz()
+                records = []
+                for date, count, first, last in self.db.execute(
+                        "SELECT date, COUNT(*), MIN(ts), MAX(ts) FROM entries "
+                        "GROUP BY date ORDER BY date DESC"):
+                    rec = days.day_record(date, [{"ts": first}, {"ts": last}], tz)
+                    rec["count"] = count
+                    records.append(rec)
+                self._manifest = (None, records)
+                self._manifest_key = key
+            return self._manifest[1]
+
+    def day(self, date):
+        with self.lock:
+            self._fresh()
+            return [json.loads(body) for (body,) in self.db.execute(
+                "SELECT body FROM entries WHERE date = ? ORDER BY pos", (date,))]
+
+    def dates(self):
+        with self.lock:
+            self._fresh()
+            return [d for (d,) in self.db.execute("SELECT DISTINCT date FROM entries ORDER BY date")]
+
+    def find(self, entry_id):
+        with self.lock:
+            self._fresh()
+            row = self.db.execute("SELECT date, body FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, None)
+
+    def query(self, since=None, until=None, match=None, hints=None):
+        hints = hints or {}
+        where, params = [], []
+        if since:
+            where.append("e.date >= ?")
+            params.append(since)
+        if until:
+            where.append("e.date <= ?")
+            params.append(until)
+        if hints.get("mood"):
+            where.append("e.mood = ?")
+            params.append(hints["mood"])
+        if hints.get("type"):
+            where.append("e.type = ?")
+            params.append(hints["type"])
+        for tag in hints.get("tags") or ():
+            where.append("e.id IN (SELECT entry_id FROM tags WHERE tag = ?)")
+            params.append(tag)
+        text = hints.get("text")
+        if text and self.fts and len(text) >= 3:
+            where.append("e.rowid IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+            params.append('"' + text.replace('"', '""') + '"')
+        elif text and text.isascii():
+            # LIKE folds case for ASCII only; other text is left to match
+            where.append("e.search LIKE ? ESCAPE '\\'")
+            params.append(_like(text))
+        sql = ("SELECT e.date, e.body FROM entries e"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY e.date DESC, e.ts DESC, e.id LIMIT ? OFFSET ?")
+
+        # Fetched a page at a time so the lock is not held while the caller works
+        offset = 0
+        while True:
+            with self.lock:
+                self._fresh()
+                rows = self.db.execute(sql, params + [PAGE_SIZE, offset]).fetchall()
+            for date, body in rows:
+                e = json.loads(body)
+                if match is None or match(e):
+                    yield date, e
+            if len(rows) < PAGE_SIZE:
+                return
+            offset += PAGE_SIZE
+
+    # ── Writes ──
+
+    def write_day(self, date, entries):
+        with self.lock:
+            self._store(date, entries, dirty=True)
+        return [f"data/entries/{date}.json", "data/index.json"]
+
+    def flush(self):
+        """Export dirty days and the manifest to the JSON files."""
+        with self.lock:
+            dirty = [d for (d,) in self.db.execute("SELECT date FROM days WHERE dirty = 1")]
+            if not dirty:
+                return []
+            mode = self.storage_mode()
+            paths = []
+            for date in dirty:
+                path = self.entries_dir / f"{date}.json"
+                entries = self.day(date)
+                if entries:
+                    self.entries_dir.mkdir(parents=True, exist_ok=True)
+                    timeline._write_text(path, storage.dumps(entries, mode))
+                    self.db.execute("UPDATE days SET sig = ?, dirty = 0 WHERE date = ?", (_sig(path), date))
+                else:
+                    if path.exists():
+                        path.unlink()
+                    self.db.execute("DELETE FROM days WHERE date = ?", (date,))
+                paths.append(f"data/entries/{date}.json")
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            timeline._write_text(self.index_path, storage.dumps_manifest(self.manifest(), mode))
+            return paths + ["data/index.json"]
+
+    def reset(self):
+        with self.lock:
+            self._manifest_key = None
+            self._sync()
+
+    # ── Internals ──
+
+    def _fresh(self):
+        if time.monotonic() - self._synced > SYNC_INTERVAL:
+            self._sync()
+
+    def _sync(self):
+        """Re-import day files that changed, appeared or vanished on disk."""
+        self._synced = time.monotonic()
+        known = {d: (sig, dirty) for d, sig, dirty in self.db.execute("SELECT date, sig, dirty FROM days")}
+        on_disk = {}
+        try:
+            with os.scandir(self.entries_dir) as it:
+                for f in it:
+                    if days.DAY_FILE.match(f.name):
+                        on_disk[f.name[:-5]] = _sig(f.path)
+        except OSError:
+            pass
+        for date, sig in on_disk.items():
+            old = known.get(date)
+            if old is None or (old[0] != sig and not old[1]):
+                try:
+                    entries = storage.loads((self.entries_dir / f"{date}.json").read_text())
+                except (OSError, ValueError):
+                    continue
+                self._store(date, entries, dirty=False, sig=sig)
+        for date, (sig, dirty) in known.items():
+            if date not in on_disk and not dirty:
+                self._store(date, [], dirty=False)
+
+    def _store(self, date, entries, dirty, sig=None):
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [e["id"] for e in entries if "id" in e]
+            old = db.execute("SELECT rowid, id FROM entries WHERE date = ?", (date,)).fetchall()
+            old += db.execute(f"SELECT rowid, id FROM entries WHERE date != ? AND id IN "
+                              f"({','.join('?' * len(ids))})", [date, *ids]).fetchall() if ids else []
+            for rowid, eid in old:
+                db.execute("DELETE FROM tags WHERE entry_id = ?", (eid,))
+                db.execute("DELETE FROM attachments WHERE entry_id = ?", (eid,))
+                if self.fts:
+                    db.execute("DELETE FROM entries_fts WHERE rowid = ?", (rowid,))
+                db.execute("DELETE FROM entries WHERE rowid = ?", (rowid,))
+            for pos, e in enumerate(entries):
+                if "id" not in e:
+                    continue
+                text = timeline.search_text(e)
+                cur = db.execute(
+                    "INSERT INTO entries (id, date, pos, ts, type, mood, reply_to, search, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (e["id"], date, pos, e.get("ts", ""), e.get("type"), e.get("mood"),
+                     e.get("replyTo"), text, json.dumps(e)))
+                if self.fts:
+                    db.execute("INSERT INTO entries_fts (rowid, search) VALUES (?, ?)", (cur.lastrowid, text))
+                db.executemany("INSERT OR IGNORE INTO tags (entry_id, tag) VALUES (?, ?)",
+                               [(e["id"], t) for t in e.get("tags") or []])
+                db.executemany("INSERT INTO attachments (entry_id, pos, type, url, sha256, size) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               [(e["id"], i, a.get("type"), a.get("url"), a.get("sha256"), a.get("size"))
+                                for i, a in enumerate(e.get("attachments") or [])])
+            if dirty:
+                db.execute("INSERT INTO days (date, dirty) VALUES (?, 1) "
+                           "ON CONFLICT (date) DO UPDATE SET dirty = 1", (date,))
+            elif entries:
+                db.execute("INSERT OR REPLACE INTO days (date, sig, dirty) VALUES (?, ?, 0)", (date, sig))
+            else:
+                db.execute("DELETE FROM days WHERE date = ?", (date,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
@@ -0,0 +1,265 @@
+"""History analytics for `./whatsup --stats`.
+
+Posting frequency by hour and weekday, moods and how they change from
+one entry to the next, posting streaks, and the most used tags and link
+domains, over the whole timeline or a --since/--until range.
+
+Every statistic is kept as a partial that can be merged with the next
+one in time order: counters add up, and streaks and mood transitions
+carry their first and last day (and mood) so runs that cross a boundary
+join up. The partial for each calendar month is cached in the repo's
+.git directory together with the (mtime, size) of that month's day
+files, so a run only re-reads the months whose files changed. Months
+cut by the range are computed from their day files on the spot.
+"""
+
+import json
+import os
+from collections import Counter
+from datetime import date as Date, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import days
+
+CACHE_NAME = "whatsup-stats.json"
+CACHE_VERSION = 1
+TOP = 10          # tags, domains and transitions listed (--limit)
+BAR_WIDTH = 40
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+COUNTERS = ("types", "moods", "tags", "domains")
+
+
+def cache_path(root="."):
+    root = Path(root)
+    git_dir = root / ".git"
+    return git_dir / CACHE_NAME if git_dir.is_dir() else root / f".{CACHE_NAME}"
+
+
+# ── Partials ──
+
+def empty():
+    return {"entries": 0, "days": 0, "hours": [0] * 24, "weekdays": [0] * 7,
+            "types": {}, "moods": {}, "tags": {}, "domains": {}, "transitions": {},
+            "first": None, "last": None, "head": 0, "tail": 0, "longest": 0, "longestEnd": None,
+            "firstMood": None, "lastMood": None}
+
+
+def _domain(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def day_partial(date, entries, tz):
+    """The partial for one day file's entries."""
+    part = empty()
+    if not entries:
+        return part
+    types, moods, tags, domains = Counter(), Counter(), Counter(), Counter()
+    transitions = {}
+    last_mood = None
+    for e in sorted(entries, key=lambda e: e.get("ts", "")):
+        t = days.parse_ts(e["ts"]).astimezone(tz)
+        part["hours"][t.hour] += 1
+        part["weekdays"][t.weekday()] += 1
+        types[e.get("type") or "post"] += 1
+        tags.update(e.get("tags") or [])
+        domains.update(d for d in (_domain(l.get("url", "")) for l in e.get("links") or []) if d)
+        mood = e.get("mood")
+        if mood:
+            moods[mood] += 1
+            if part["firstMood"] is None:
+                part["firstMood"] = mood
+            if last_mood and last_mood != mood:
+                row = transitions.setdefault(last_mood, {})
+                row[mood] = row.get(mood, 0) + 1
+            last_mood = mood
+    part.update(entries=len(entries), days=1, types=dict(types), moods=dict(moods), tags=dict(tags),
+                domains=dict(domains), transitions=transitions, first=date, last=date,
+                head=1, tail=1, longest=1, longestEnd=date, lastMood=last_mood)
+    return part
+
+
+def _span(part):
+    return (Date.fromisoformat(part["last"]) - Date.fromisoformat(part["first"])).days + 1
+
+
+def merge_into(acc, part):
+    """Fold part, which comes after everything in acc, into acc."""
+    if not part["entries"]:
+        return acc
+    for key in ("hours", "weekdays"):
+        acc[key] = [a + b for a, b in zip(acc[key], part[key])]
+    for key in COUNTERS:
+        counts = acc[key]
+        for k, n in part[key].items():
+            counts[k] = counts.get(k, 0) + n
+    for a, row in part["transitions"].items():
+        mine = acc["transitions"].setdefault(a, {})
+        for b, n in row.items():
+            mine[b] = mine.get(b, 0) + n
+    acc["entries"] += part["entries"]
+    acc["days"] += part["days"]
+
+    if not acc["first"]:
+        acc.update(first=part["first"], last=part["last"], head=part["head"], tail=part["tail"],
+                   longest=part["longest"], longestEnd=part["longestEnd"],
+                   firstMood=part["firstMood"], lastMood=part["lastMood"])
+        return acc
+    adjacent = (Date.fromisoformat(part["first"]) - Date.fromisoformat(acc["last"])).days == 1
+    joined = acc["tail"] + part["head"] if adjacent else 0
+    head = acc["head"] + part["head"] if adjacent and acc["head"] == _span(acc) else acc["head"]
+    tail = acc["tail"] + part["tail"] if adjacent and part["tail"] == _span(part) else part["tail"]
+    for length, end in ((part["longest"], part["longestEnd"]),
+                        (joined, (Date.fromisoformat(part["first"]) + timedelta(days=part["head"] - 1)).isoformat())):
+        if length > acc["longest"]:
+            acc["longest"], acc["longestEnd"] = length, end
+    if acc["lastMood"] and part["firstMood"] and acc["lastMood"] != part["firstMood"]:
+        row = acc["transitions"].setdefault(acc["lastMood"], {})
+        row[part["firstMood"]] = row.get(part["firstMood"], 0) + 1
+    acc.update(last=part["last"], head=head, tail=tail,
+               firstMood=acc["firstMood"] or part["firstMood"], lastMood=part["lastMood"] or acc["lastMood"])
+    return acc
+
+
+# ── Months and the cache ──
+
+def _day_files(entries_dir):
+    """{date: "mtime:size"} for every day file."""
+    found = {}
+    try:
+        with os.scandir(entries_dir) as it:
+            for f in it:
+                if days.DAY_FILE.match(f.name):
+                    st = f.stat()
+                    found[f.name[:-5]] = f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        pass
+    return found
+
+
+def _load_cache(path, tz_key):
+    try:
+        cache = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION or cache.get("tz") != tz_key:
+        return {}
+    return cache.get("months") or {}
+
+
+def _save_cache(path, tz_key, months):
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "tz": tz_key, "months": months},
+                                  separators=(",", ":")))
+        os.replace(tmp, path)
+    except OSError:
+        pass   # a read-only checkout just goes without the cache
+
+
+def collect(tl, since=None, until=None):
+    """The merged partial for days in [since, until]. Returns (partial,
+    months recomputed)."""
+    tz = tl.tz()
+    tz_key = getattr(tz, "key", "UTC")
+    files = _day_files(tl.entries_dir)
+    by_month = {}
+    for date in sorted(files):
+        by_month.setdefault(date[:7], []).append(date)
+
+    path = cache_path(tl.root)
+    cached = _load_cache(path, tz_key)
+    months = {m: c for m, c in cached.items() if m in by_month}
+    dirty = len(months) != len(cached)
+    recomputed = 0
+    acc = empty()
+    for month, dates in sorted(by_month.items()):
+        inside = [d for d in dates if (not since or d >= since) and (not until or d <= until)]
+        if not inside:
+            continue
+        if len(inside) < len(dates):
+            # Cut by the range: only this run needs these days
+            for d in inside:
+                merge_into(acc, day_partial(d, tl.day(d), tz))
+            continue
+        sig = ",".join(f"{d}={files[d]}" for d in dates)
+        hit = months.get(month)
+        if hit is None or hit["sig"] != sig:
+            part = empty()
+            for d in dates:
+                merge_into(part, day_partial(d, tl.day(d), tz))
+            months[month] = hit = {"sig": sig, "partial": part}
+            dirty = True
+            recomputed += 1
+        merge_into(acc, hit["partial"])
+    if dirty:
+        _save_cache(path, tz_key, months)
+    return acc, recomputed
+
+
+# ── Report ──
+
+def _top(counts, n):
+    return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+def summary(part, today, top=TOP):
+    """JSON-friendly statistics from a merged partial."""
+    transitions = [(f"{a} -> {b}", n) for a, row in part["transitions"].items() for b, n in row.items()]
+    current = part["tail"] if part["last"] and part["last"] >= (
+        Date.fromisoformat(today) - timedelta(days=1)).isoformat() else 0
+    longest_start = (Date.fromisoformat(part["longestEnd"]) - timedelta(days=part["longest"] - 1)).isoformat() \
+        if part["longestEnd"] else None
+    return {
+        "first": part["first"],
+        "last": part["last"],
+        "entries": part["entries"],
+        "days": part["days"],
+        "span": _span(part) if part["first"] else 0,
+        "hours": part["hours"],
+        "weekdays": dict(zip(WEEKDAYS, part["weekdays"])),
+        "types": dict(_top(part["types"], len(part["types"]))),
+        "moods": dict(_top(part["moods"], len(part["moods"]))),
+        "transitions": dict(_top(dict(transitions), top)),
+        "streaks": {"longest": part["longest"], "longestFrom": longest_start,
+                    "longestTo": part["longestEnd"], "current": current},
+        "tags": dict(_top(part["tags"], top)),
+        "domains": dict(_top(part["domains"], top)),
+    }
+
+
+def _bars(rows, out):
+    peak = max((n for _, n in rows), default=0) or 1
+    for label, n in rows:
+        out.write(f"  {label:<4}{'#' * round(BAR_WIDTH * n / peak):<{BAR_WIDTH}} {n}\n")
+
+
+def _ranked(title, counts, total, out):
+    if not counts:
+        return
+    out.write(f"\n{title}:\n")
+    width = max(len(k) for k in counts)
+    for k, n in counts.items():
+        share = f" ({100 * n / total:.0f}%)" if total else ""
+        out.write(f"  {k:<{width}}  {n}{share}\n")
+
+
+def write_report(s, out):
+    if not s["entries"]:
+        out.write("No entries in range.\n")
+        return
+    out.write(f"{s['entries']} entries on {s['days']} of {s['span']} days, {s['first']} to {s['last']} "
+              f"({s['entries'] / s['days']:.1f} per active day)\n")
+    out.write("\nBy hour:\n")
+    _bars([(f"{h:02d}", n) for h, n in enumerate(s["hours"])], out)
+    out.write("\nBy weekday:\n")
+    _bars(list(s["weekdays"].items()), out)
+    st = s["streaks"]
+    out.write(f"\nStreaks: longest {st['longest']} day{'' if st['longest'] == 1 else 's'} "
+              f"({st['longestFrom']} to {st['longestTo']}), current {st['current']}\n")
+    _ranked("Types", s["types"], s["entries"], out)
+    _ranked("Moods", s["moods"], sum(s["moods"].values()), out)
+    _ranked("Mood changes", s["transitions"], None, out)
+    _ranked("Top tags", s["tags"], None, out)
+    _ranked("Top link domains", s["domains"], None, out)
@@ -0,0 +1,78 @@
+"""On-disk encoding of whatsup day files.
+
+config.json's "storage" picks how entries are written:
+
+- "pretty" (default): indented JSON with every field, as always.
+- "compact": one minified entry per line, leaving out fields that hold
+  their default (no mood, no links, no tags, ...). Diffs stay one line
+  per entry.
+- "short": compact, with single-letter field names as well.
+
+Readers accept all three, even mixed within a file: loads() and expand()
+return entries with every field present under its full name, which is
+what the rest of whatsup works with. `./whatsup --storage <mode>`
+rewrites existing day files in another encoding.
+"""
+
+import json
+
+PRETTY, COMPACT, SHORT = "pretty", "compact", "short"
+MODES = (PRETTY, COMPACT, SHORT)
+
+# Field order of a full entry, and the value a field holds when unset
+FIELDS = ("id", "ts", "type", "content", "mood", "links", "attachments", "replyTo", "tags")
+DEFAULTS = {"type": "post", "mood": None, "links": [], "attachments": [], "replyTo": None, "tags": []}
+SHORT_KEYS = {"id": "i", "ts": "t", "type": "y", "content": "c", "mood": "m",
+              "links": "l", "attachments": "a", "replyTo": "r", "tags": "g"}
+LONG_KEYS = {v: k for k, v in SHORT_KEYS.items()}
+
+
+def mode(config):
+    value = (config or {}).get("storage") or PRETTY
+    return value if value in MODES else PRETTY
+
+
+def expand(entry):
+    """entry with full field names and every default filled in."""
+    if all(k in entry for k in DEFAULTS) and not any(k in LONG_KEYS for k in entry):
+        return entry
+    named = {LONG_KEYS.get(k, k): v for k, v in entry.items()}
+    full = {}
+    for k in FIELDS:
+        if k in named:
+            full[k] = named.pop(k)
+        elif k in DEFAULTS:
+            default = DEFAULTS[k]
+            full[k] = list(default) if isinstance(default, list) else default
+    full.update(named)
+    return full
+
+
+def shrink(entry, short=False):
+    """entry without default-valued fields, optionally with short names."""
+    out = {}
+    for k, v in entry.items():
+        if k in DEFAULTS and v == DEFAULTS[k]:
+            continue
+        out[SHORT_KEYS.get(k, k) if short else k] = v
+    return out
+
+
+def dumps(entries, storage=PRETTY):
+    """Text of a day file holding entries, in the given storage mode."""
+    if storage == PRETTY:
+        return json.dumps([expand(e) for e in entries], indent=2)
+    lines = [json.dumps(shrink(expand(e), storage == SHORT), separators=(",", ":"))
+             for e in entries]
+    return "[\n" + ",\n".join(lines) + "\n]\n" if lines else "[]\n"
+
+
+def loads(text):
+    """Entries of a day file in any storage mode, fully expanded."""
+    return [expand(e) for e in json.loads(text)]
+
+
+def dumps_manifest(records, storage=PRETTY):
+    if storage == PRETTY:
+        return json.dumps(records, indent=2)
+    return "[\n" + ",\n".join(json.dumps(m, separators=(",", ":")) for m in records) + "\n]\n"
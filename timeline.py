@@ -0,0 +1,781 @@
+"""Timeline storage and the whatsup commands that operate on it.
+
+A Timeline wraps one repo's data/ directory: the manifest, the day files
+and an optional entry-ID index. Everything it reads is cached in memory
+and revalidated against the file's (mtime, size) on each access, so a
+long-lived Timeline (the daemon's) answers from memory yet still sees
+edits made behind its back, while a one-shot CLI run pays only for the
+files it touches. Writes go through the same files as always, each
+replaced atomically, and every add/replace/remove is also appended to
+the op log (oplog.py), which backs --undo, --history and --ops-since,
+and patched into the syndication feeds (feeds.py). Day files are read
+and written through storage.py, so entries are always full in memory
+whatever encoding config.json asks for on disk.
+
+With "backend": "sqlite" in config.json, for_root() returns the SQLite
+subclass from sqlstore.py instead; the commands below work unchanged.
+
+The cmd_* functions implement the CLI commands on top of a Timeline and
+write their output to the streams they are given, which lets daemon.py
+run them in-process for remote clients.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import attachments
+import days
+import feeds
+import oplog
+import storage
+
+DAY_CACHE_SIZE = 64   # parsed day files kept in memory
+REGEX_SYNTAX = re.compile(r"[\\.^$*+?{}\[\]|()]")
+
+
+class CommandError(Exception):
+    """A command failed in a way the user should see; the message is printed."""
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def _write_text(path, text):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class Timeline:
+    """Cached, thread-safe access to one repo's entries and manifest."""
+
+    def __init__(self, root=".", index_ids=False, cache_days=DAY_CACHE_SIZE):
+        self.root = Path(root)
+        self.entries_dir = self.root / "data" / "entries"
+        self.index_path = self.root / "data" / "index.json"
+        self.oplog = oplog.OpLog(oplog.log_path(self.root), self.root / oplog.LEGACY_PATH)
+        self.lock = threading.RLock()
+        self.cache_days = cache_days
+        self._days = OrderedDict()      # date -> (signature, entries), LRU
+        self._manifest = (None, [])     # (signature, records)
+        self._config = (None, {})
+        self._ids = None                # entry ID -> date, once indexed
+        self._day_ids = {}              # date -> IDs indexed from that day
+        self._id_sigs = {}              # date -> signature the index was built from
+        if index_ids:
+            with self.lock:
+                self._ids = {}
+                self._refresh_ids()
+
+    # ── Reads ──
+
+    def config(self):
+        path = self.root / "config.json"
+        sig = _signature(path)
+        with self.lock:
+            if sig != self._config[0]:
+                try:
+                    self._config = (sig, json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    self._config = (sig, {})
+            return self._config[1]
+
+    def tz(self):
+        return days.zone(self.config())
+
+    def storage_mode(self):
+        return storage.mode(self.config())
+
+    def manifest(self):
+        """Manifest records, newest day first. Treat the list as read-only."""
+        sig = _signature(self.index_path)
+        with self.lock:
+            if sig != self._manifest[0]:
+                try:
+                    records = json.loads(self.index_path.read_text())
+                except (OSError, ValueError):
+                    records = []
+                self._manifest = (sig, records)
+            return self._manifest[1]
+
+    def day(self, date):
+        """Entries filed under date, oldest first. Treat the list as read-only."""
+        path = self.entries_dir / f"{date}.json"
+        sig = _signature(path)
+        with self.lock:
+            hit = self._days.get(date)
+            if hit is not None and hit[0] == sig:
+                self._days.move_to_end(date)
+                return hit[1]
+            entries = []
+            if sig is not None:
+                try:
+                    entries = storage.loads(path.read_text())
+                except (OSError, ValueError):
+                    entries = []
+            self._remember(date, sig, entries)
+            return entries
+
+    def dates(self):
+        """Every date that has a day file, oldest first."""
+        try:
+            names = os.listdir(self.entries_dir)
+        except OSError:
+            return []
+        return sorted(n[:-5] for n in names if days.DAY_FILE.match(n))
+
+    def find(self, entry_id):
+        """(date, entry) for entry_id, or (None, None)."""
+        with self.lock:
+            if self._ids is None:
+                for date in reversed(self.dates()):
+                    for e in self.day(date):
+                        if e.get("id") == entry_id:
+                            return date, e
+                return None, None
+            for attempt in (0, 1):
+                date = self._ids.get(entry_id)
+                if date is not None:
+                    for e in self.day(date):
+                        if e.get("id") == entry_id:
+                            return date, e
+                if attempt == 0:
+                    self._refresh_ids()
+            return None, None
+
+    def query(self, since=None, until=None, match=None, hints=None):
+        """Yield (date, entry) newest first for days in [since, until].
+
+        Candidate days come from the manifest and are read one at a time.
+        hints ({"tags", "mood", "type", "text"}) let an indexed backend
+        narrow the scan; match alone decides what is yielded.
+        """
+        dates = sorted((m["date"] for m in self.manifest()
+                        if m.get("count", 1) and (not since or m["date"] >= since)
+                        and (not until or m["date"] <= until)), reverse=True)
+        for date in dates:
+            for e in sorted(self.day(date), key=lambda e: e.get("ts", ""), reverse=True):
+                if match is None or match(e):
+                    yield date, e
+
+    # ── Writes ──
+
+    def write_day(self, date, entries):
+        """Replace date's entries (removing the day if empty) and its manifest record.
+
+        Returns the repo-relative paths that changed.
+        """
+        path = self.entries_dir / f"{date}.json"
+        with self.lock:
+            if entries:
+                self.entries_dir.mkdir(parents=True, exist_ok=True)
+                _write_text(path, storage.dumps(entries, self.storage_mode()))
+            elif path.exists():
+                path.unlink()
+            self._remember(date, _signature(path), entries)
+
+            manifest = [m for m in self.manifest() if m["date"] != date]
+            if entries:
+                manifest.append(days.day_record(date, entries, self.tz()))
+            manifest.sort(key=lambda m: m["date"], reverse=True)
+            _write_text(self.index_path, storage.dumps_manifest(manifest, self.storage_mode()))
+            self._manifest = (_signature(self.index_path), manifest)
+
+            if self._ids is not None:
+                self._index_day(date, entries, self._days[date][0] if entries else None)
+        return [f"data/entries/{date}.json", "data/index.json"]
+
+    def add(self, entry, undoes=None):
+        """File a new entry under its local date. Returns (date, changed paths)."""
+        with self.lock:
+            date = days.local_date(entry["ts"], self.tz())
+            paths = self.write_day(date, self.day(date) + [entry])
+            return date, paths + self._log("post", entry["id"], date, entry=entry, undoes=undoes)
+
+    def replace(self, entry_id, fn, undoes=None):
+        """Swap entry_id for fn(entry) in place. Returns (date, paths) or (None, [])."""
+        with self.lock:
+            date, entry = self.find(entry_id)
+            if date is None:
+                return None, []
+            new = fn(entry)
+            paths = self.write_day(date, [new if e.get("id") == entry_id else e
+                                          for e in self.day(date)])
+            return date, paths + self._log("edit", entry_id, date, entry=new, prev=entry, undoes=undoes)
+
+    def remove(self, entry_id, undoes=None):
+        """Delete entry_id. Returns (date, paths) or (None, [])."""
+        with self.lock:
+            date, entry = self.find(entry_id)
+            if date is None:
+                return None, []
+            paths = self.write_day(date, [e for e in self.day(date) if e.get("id") != entry_id])
+            return date, paths + self._log("delete", entry_id, date, prev=entry, undoes=undoes)
+
+    def flush(self):
+        """Write out changes held back until publishing; returns their paths.
+
+        Day files are written as they change here, so there are none."""
+        return []
+
+    def reset(self):
+        """Forget every cached file (after a bulk rewrite such as rebucket)."""
+        with self.lock:
+            self._days.clear()
+            self._manifest = (None, [])
+            if self._ids is not None:
+                self._ids, self._day_ids, self._id_sigs = {}, {}, {}
+                self._refresh_ids()
+
+    # ── Internals ──
+
+    def _log(self, op, entry_id, date, **fields):
+        """Record a change in the op log and the feeds; returns their changed paths."""
+        # The log keeps entries without their default fields
+        fields = {k: storage.shrink(v) if k in ("entry", "prev") else v for k, v in fields.items()}
+        unpublished = self.oplog.adopt()
+        rec = self.oplog.append(op, entry_id, date, **fields)
+        return ([oplog.LEGACY_PATH] if unpublished else []) + feeds.update(self, rec)
+
+    def _remember(self, date, sig, entries):
+        self._days[date] = (sig, entries)
+        self._days.move_to_end(date)
+        while len(self._days) > self.cache_days:
+            self._days.popitem(last=False)
+
+    def _index_day(self, date, entries, sig):
+        for eid in self._day_ids.pop(date, ()):
+            if self._ids.get(eid) == date:
+                del self._ids[eid]
+        ids = {e["id"] for e in entries if "id" in e}
+        for eid in ids:
+            self._ids[eid] = date
+        if ids:
+            self._day_ids[date] = ids
+        if sig is None:
+            self._id_sigs.pop(date, None)
+        else:
+            self._id_sigs[date] = sig
+
+    def _refresh_ids(self):
+        """Re-index day files that changed (or appeared, or vanished) on disk."""
+        present = set(self.dates())
+        for date in set(self._id_sigs) - present:
+            self._index_day(date, [], None)
+        for date in present:
+            sig = _signature(self.entries_dir / f"{date}.json")
+            if sig != self._id_sigs.get(date):
+                self._index_day(date, self.day(date), sig)
+
+
+def for_root(root=".", **kwargs):
+    """The Timeline for root, using the backend its config.json names."""
+    tl = Timeline(root, **kwargs)
+    if tl.config().get("backend") == "sqlite":
+        import sqlstore
+        return sqlstore.SqliteTimeline(root, **kwargs)
+    return tl
+
+
+# ── Commands ──
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def cmd_post(tl, opts, out, err):
+    content = opts.get("content") or ""
+    if not content:
+        raise CommandError("content is required")
+    mood = opts.get("mood") or None
+    gif = opts.get("gif") or None
+    link = opts.get("link") or None
+    pdf = opts.get("pdf") or None
+    image = opts.get("image") or None
+    file_name = opts.get("file_name") or None
+    reply_to = opts.get("reply") or None
+    tags = opts.get("tags") or []
+    for label, path in (("PDF", pdf), ("image", image)):
+        if path and not os.path.isfile(path):
+            raise CommandError(f"{label} not found: {path}")
+
+    root = tl.root
+    config = tl.config()
+    entry_id = uuid.uuid4().hex[:8]
+
+    # Entry type
+    entry_type = "post"
+    if mood: entry_type = "mood"
+    elif reply_to: entry_type = "reply"
+    elif link: entry_type = "link"
+
+    entry = {
+        "id": entry_id,
+        "ts": _now(),
+        "type": entry_type,
+        "content": content,
+        "mood": mood,
+        "links": [],
+        "attachments": [],
+        "replyTo": reply_to,
+        "tags": tags,
+    }
+    changed = set()
+
+    # Mirror the GIF on a thread so it downloads while the link unfurls
+    mirrored = {}
+    mirror_thread = None
+    if gif and (opts.get("mirror") or config.get("mirrorGifs")):
+        import mirror
+
+        def fetch_gif():
+            try:
+                mirrored["fields"] = mirror.mirror(gif, root=str(root),
+                                                   max_bytes=int(config.get("mirrorMaxBytes", mirror.MAX_BYTES)))
+            except Exception as e:
+                mirrored["error"] = e
+
+        mirror_thread = threading.Thread(target=fetch_gif, daemon=True)
+        mirror_thread.start()
+
+    cache = None
+    if opts.get("unfurl") or config.get("unfurl"):
+        import unfurl
+        cache = unfurl.Cache(root / unfurl.CACHE_PATH)
+
+    pending_link = None
+    if link:
+        meta = None
+        if cache is not None:
+            meta = cache.get(link)
+            if meta is None:
+                fetched = unfurl.unfurl_many([link], budget=float(config.get("unfurlBudget", 1.5)))
+                if link in fetched:
+                    meta = fetched[link]
+                    cache.put(link, meta)
+                else:
+                    pending_link = link
+        if cache is not None:
+            entry["links"].append(unfurl.link_record(link, meta))
+        else:
+            title = link.rstrip("/").split("/")[-1] or link
+            entry["links"].append({"url": link, "title": title})
+
+    if gif:
+        if mirror_thread is not None:
+            mirror_thread.join(mirror.TIMEOUT + 1)
+            if "fields" not in mirrored:
+                err.write(f"Warning: could not mirror GIF ({mirrored.get('error', 'timed out')}); linking it instead\n")
+        fields = mirrored.get("fields")
+        if fields:
+            changed.update([fields["url"], fields["poster"]])
+        entry["attachments"].append({"type": "gif", **(fields or {"url": gif})})
+
+    for att_type, path in (("pdf", pdf), ("image", image)):
+        if path:
+            stored = attachments.stored_fields(path, root) or attachments.store_file(path, root)
+            changed.add(stored["url"])
+            entry["attachments"].append({"type": att_type, "url": stored["url"],
+                                         "title": file_name or os.path.basename(path),
+                                         "sha256": stored["sha256"], "size": stored["size"]})
+
+    with tl.lock:
+        # Backfill titles that finished unfurling after earlier posts
+        if cache is not None:
+            changed.update(_backfill_unfurls(tl, cache))
+
+        # Filed under the local date in the configured timezone
+        today, paths = tl.add(entry)
+        changed.update(paths)
+
+        if cache is not None:
+            if pending_link:
+                cache.add_pending(entry_id, today, pending_link)
+                unfurl.warm_in_background([pending_link], root=str(root))
+            cache.save()
+            changed.add(unfurl.CACHE_PATH)
+
+    out.write(f"Created entry {entry_id}\n")
+    return sorted(changed), f"whatsup: {content[:50]}"
+
+
+def _backfill_unfurls(tl, cache):
+    """Put titles the background fetch has cached into their pending
+    entries; returns the changed paths. Call with tl.lock held."""
+    import unfurl
+
+    changed = set()
+    for pending_id, rec in list(cache.pending.items()):
+        meta = cache.get(rec["url"])
+        if meta is None:
+            # Give up on links the background fetch never resolved
+            if time.time() - rec.get("since", 0) > unfurl.FAILURE_TTL:
+                cache.drop_pending(pending_id)
+            continue
+        cache.drop_pending(pending_id)
+        if not meta:
+            continue
+
+        def backfill(e, url=rec["url"], meta=meta):
+            return dict(e, links=[unfurl.link_record(l["url"], meta) if l["url"] == url else l
+                                  for l in e.get("links", [])])
+
+        changed.update(tl.replace(pending_id, backfill)[1])
+    return changed
+
+
+def cmd_backfill(tl, opts, out, err):
+    """Run by the background unfurl fetcher once its titles are cached."""
+    import unfurl
+
+    cache_path = tl.root / unfurl.CACHE_PATH
+    if not cache_path.exists():
+        return None
+    with tl.lock:
+        cache = unfurl.Cache(cache_path)
+        if not cache.pending:
+            return None
+        changed = _backfill_unfurls(tl, cache)
+        cache.save()
+    out.write("Filled in unfurled link titles\n")
+    return sorted(changed | {unfurl.CACHE_PATH}), "whatsup: fill in unfurled link titles"
+
+
+def cmd_edit(tl, opts, out, err):
+    entry_id = opts.get("id") or ""
+    content = opts.get("content") or ""
+    if not entry_id:
+        raise CommandError("--edit requires an entry ID")
+    if not content:
+        raise CommandError("--edit requires content")
+    date, paths = tl.replace(entry_id, lambda e: dict(e, content=content, ts=_now()))
+    if date is None:
+        raise CommandError(f"entry {entry_id} not found")
+    out.write(f"Updated {entry_id}\n")
+    return paths, f"whatsup: edit {entry_id}"
+
+
+def cmd_delete(tl, opts, out, err):
+    entry_id = opts.get("id") or ""
+    if not entry_id:
+        raise CommandError("--delete requires an entry ID")
+    date, paths = tl.remove(entry_id)
+    if date is None:
+        raise CommandError(f"entry {entry_id} not found")
+    out.write(f"Deleted {entry_id}\n")
+    return paths, f"whatsup: delete {entry_id}"
+
+
+def cmd_undo(tl, opts, out, err):
+    with tl.lock:
+        rec = tl.oplog.undoable()
+        if rec is None:
+            raise CommandError("nothing to undo")
+        entry_id, seq = rec["id"], rec["seq"]
+        if rec["op"] == "post":
+            date, paths = tl.remove(entry_id, undoes=seq)
+        elif rec["op"] == "edit":
+            date, paths = tl.replace(entry_id, lambda e: storage.expand(rec["prev"]), undoes=seq)
+        else:
+            if tl.find(entry_id)[0] is not None:
+                raise CommandError(f"entry {entry_id} exists again; not restoring it")
+            date, paths = tl.add(storage.expand(rec["prev"]), undoes=seq)
+        if date is None:
+            raise CommandError(f"cannot undo {rec['op']} of {entry_id}: the entry no longer exists")
+    out.write(f"Undid {rec['op']} of {entry_id} (op {seq})\n")
+    return paths, f"whatsup: undo {rec['op']} {entry_id}"
+
+
+def cmd_history(tl, opts, out, err):
+    entry_id = opts.get("id") or ""
+    if not entry_id:
+        raise CommandError("--history requires an entry ID")
+    tz = tl.tz()
+    shown = 0
+    for rec in tl.oplog.history(entry_id):
+        if opts.get("json"):
+            out.write(json.dumps(rec) + "\n")
+        else:
+            t = days.parse_ts(rec["at"]).astimezone(tz).strftime("%Y-%m-%d %H:%M")
+            undo = f" (undoes op {rec['undoes']})" if "undoes" in rec else ""
+            if rec["op"] == "move":
+                text = f"{rec.get('from')} -> {rec['date']}"
+            else:
+                text = " ".join(((rec.get("entry") or rec.get("prev") or {}).get("content") or "").split())
+            out.write(f"  #{rec['seq']} [{t}] {rec['op']}{undo}: {text}\n")
+        shown += 1
+    if shown == 0 and not opts.get("json"):
+        out.write(f"No history for {entry_id}.\n")
+    return None
+
+
+def _size(n):
+    for unit in ("bytes", "KB", "MB"):
+        if n < 1024 or unit == "MB":
+            return f"{n} {unit}" if unit == "bytes" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def cmd_storage(tl, opts, out, err):
+    mode = opts.get("storage") or ""
+    if mode not in storage.MODES:
+        raise CommandError(f"--storage expects one of {', '.join(storage.MODES)}, got {mode!r}")
+    with tl.lock:
+        tl.flush()
+        config_path = tl.root / "config.json"
+        config = dict(tl.config(), storage=mode)
+        _write_text(config_path, json.dumps(config, indent=2) + "\n")
+
+        before = after = rewritten = 0
+        for date in tl.dates():
+            path = tl.entries_dir / f"{date}.json"
+            old = path.read_text()
+            new = storage.dumps(storage.loads(old), mode)
+            before += len(old.encode())
+            after += len(new.encode())
+            if new != old:
+                _write_text(path, new)
+                rewritten += 1
+        old = tl.index_path.read_text() if tl.index_path.exists() else "[]"
+        new = storage.dumps_manifest(json.loads(old), mode)
+        before += len(old.encode())
+        after += len(new.encode())
+        _write_text(tl.index_path, new)
+        tl.reset()
+
+    change = 100 * (after - before) / before if before else 0
+    out.write(f"Rewrote {rewritten} of {len(tl.dates())} day files as {mode}: "
+              f"{_size(before)} -> {_size(after)} ({abs(change):.0f}% {'larger' if change > 0 else 'smaller'}).\n")
+    return ["data", "config.json"], f"whatsup: store entries as {mode}"
+
+
+def cmd_feeds(tl, opts, out, err):
+    with tl.lock:
+        paths = feeds.update(tl)
+    base = feeds.base_url(tl.root, tl.config()) or "(no url in config.json or CNAME; links are relative)"
+    out.write(f"Feeds {'rebuilt' if paths else 'already up to date'}: {', '.join(feeds.PATHS)} for {base}\n")
+    return (paths, "whatsup: rebuild feeds") if paths else None
+
+
+def cmd_publish_status(tl, opts, out, err):
+    import publish
+
+    out.write("Publish targets (first is primary):\n")
+    for line in publish.status_lines(str(tl.root)):
+        out.write(line + "\n")
+    return None
+
+
+def cmd_ops(tl, opts, out, err):
+    seq = str(opts.get("seq") or "0")
+    if not seq.isdigit():
+        raise CommandError(f"--ops-since expects a sequence number, got {seq!r}")
+    for rec in tl.oplog.since(int(seq)):
+        out.write(json.dumps(rec) + "\n")
+    return None
+
+
+def _parse_day(value, flag, tz):
+    """YYYY-MM-DD, or Nd for N days before today."""
+    if not value:
+        return None
+    m = re.fullmatch(r"(\d+)d", value)
+    if m:
+        return (datetime.now(tz) - timedelta(days=int(m.group(1)))).strftime("%Y-%m-%d")
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise CommandError(f"{flag} expects YYYY-MM-DD or Nd, got {value!r}")
+
+
+def search_text(e):
+    """What --grep searches: the content plus link titles (or URLs)."""
+    return " ".join([e.get("content") or ""]
+                    + [l.get("title") or l.get("url", "") for l in e.get("links") or []])
+
+
+def cmd_list(tl, opts, out, err):
+    tz = tl.tz()
+    # Day files are named by the local date in the configured timezone
+    today = days.today(tz)
+    since = _parse_day(opts.get("since"), "--since", tz)
+    until = _parse_day(opts.get("until"), "--until", tz)
+    tags = set(opts.get("tags") or [])
+    mood = opts.get("mood") or None
+    entry_type = opts.get("type") or None
+    grep = opts.get("grep") or None
+    as_json = bool(opts.get("json"))
+    limit = str(opts.get("limit") or "0")
+    if not limit.isdigit():
+        raise CommandError(f"--limit expects a number, got {limit!r}")
+    limit = int(limit)
+
+    try:
+        pattern = re.compile(grep, re.IGNORECASE) if grep else None
+    except re.error as e:
+        raise CommandError(f"bad --grep pattern: {e}")
+
+    # With no filters at all, keep the old behaviour of listing today only
+    if not (since or until or tags or mood or entry_type or pattern):
+        since = until = today
+
+    def matches(e):
+        if mood and e.get("mood") != mood: return False
+        if entry_type and e.get("type") != entry_type: return False
+        if tags and not tags.issubset(e.get("tags") or []): return False
+        if pattern and not pattern.search(search_text(e)): return False
+        return True
+
+    # A pattern without regex syntax is a plain substring an index can look up
+    hints = {"tags": tags, "mood": mood, "type": entry_type,
+             "text": grep if grep and not REGEX_SYNTAX.search(grep) else None}
+
+    shown = 0
+    last_date = None
+    for date, e in tl.query(since, until, matches, hints):
+        if as_json:
+            out.write(json.dumps(e) + "\n")
+        else:
+            if date != last_date:
+                out.write(f"{'' if shown == 0 else chr(10)}Entries for {date}:\n\n")
+                last_date = date
+            t = days.parse_ts(e["ts"]).astimezone(tz).strftime("%H:%M")
+            c = " ".join((e.get("content") or "").split())
+            m = f" [{e['mood']}]" if e.get("mood") else ""
+            tg = "".join(f" #{tag}" for tag in e.get("tags") or [])
+            out.write(f"  [{t}] ({e['id']}){m} {c}{tg}\n")
+        shown += 1
+        if limit and shown >= limit:
+            break
+
+    if shown == 0 and not as_json:
+        out.write("No entries for today.\n" if since == until == today else "No matching entries.\n")
+    return None
+
+
+def cmd_stats(tl, opts, out, err):
+    import stats
+
+    tz = tl.tz()
+    since = _parse_day(opts.get("since"), "--since", tz)
+    until = _parse_day(opts.get("until"), "--until", tz)
+    limit = str(opts.get("limit") or stats.TOP)
+    if not limit.isdigit():
+        raise CommandError(f"--limit expects a number, got {limit!r}")
+    with tl.lock:
+        part, _ = stats.collect(tl, since, until)
+    summary = stats.summary(part, days.today(tz), int(limit))
+    if opts.get("json"):
+        out.write(json.dumps(summary) + "\n")
+    else:
+        stats.write_report(summary, out)
+    return None
+
+
+def cmd_rebucket(tl, opts, out, err):
+    import unfurl
+
+    with tl.lock:
+        tl.flush()
+        tz = tl.tz()
+        if not tl.entries_dir.is_dir():
+            out.write("Nothing to rebucket.\n")
+            return None
+        before = len(tl.dates())
+        cache_path = tl.root / unfurl.CACHE_PATH
+        cache = unfurl.Cache(cache_path) if cache_path.exists() else None
+        pending = dict(cache.pending) if cache else {}
+
+        mode = tl.storage_mode()
+        manifest, moves, new_dates = days.rebucket(tz, str(tl.entries_dir), track=pending, mode=mode)
+        _write_text(tl.index_path, storage.dumps_manifest(manifest, mode))
+
+        # So --history and --ops-since readers follow entries to their new day
+        tl.oplog.adopt()
+        for entry_id, old, new in moves:
+            if entry_id:
+                tl.oplog.append("move", entry_id, new, **{"from": old})
+
+        # Pending unfurls remember which day file to backfill
+        if cache is not None:
+            for eid, date in new_dates.items():
+                rec = pending[eid]
+                if rec.get("date") != date:
+                    cache.add_pending(eid, date, rec["url"], rec.get("since"))
+            cache.save()
+        tl.reset()
+        feeds.update(tl)
+
+    out.write(f"Rebucketed {sum(m['count'] for m in manifest)} entries by {getattr(tz, 'key', 'UTC')}: "
+              f"{len(moves)} moved, {before} day files -> {len(manifest)}.\n")
+    return ["data", *feeds.PATHS], "whatsup: rebucket entries by local date"
+
+
+COMMANDS = {
+    "post": cmd_post,
+    "edit": cmd_edit,
+    "delete": cmd_delete,
+    "list": cmd_list,
+    "stats": cmd_stats,
+    "rebucket": cmd_rebucket,
+    "backfill": cmd_backfill,
+    "undo": cmd_undo,
+    "history": cmd_history,
+    "ops": cmd_ops,
+    "feeds": cmd_feeds,
+    "storage": cmd_storage,
+    "publish_status": cmd_publish_status,
+}
+
+# WU_* variables the whatsup script exports for each option
+ENV_OPTIONS = ("content", "id", "mood", "gif", "mirror", "pdf", "image", "file_name",
+               "link", "unfurl", "reply", "tags", "since", "until", "type", "grep",
+               "json", "limit", "seq", "storage")
+
+
+def opts_from_env(environ=os.environ):
+    opts = {}
+    for key in ENV_OPTIONS:
+        value = environ.get(f"WU_{key.upper()}", "")
+        if key == "tags":
+            value = json.loads(value or "[]")
+        elif key in ("mirror", "unfurl", "json"):
+            value = value == "1"
+        opts[key] = value
+    return opts
+
+
+def run(command, opts, tl, out=None, err=None):
+    """Run one command against tl.
+
+    Returns (status, commit) where commit is (paths, message) for the
+    changes to record in git, or None when nothing was written.
+    """
+    out = out or sys.stdout
+    err = err or sys.stderr
+    try:
+        change = COMMANDS[command](tl, opts, out, err)
+        if change:
+            # Backends that defer day files write them before the commit
+            change = (sorted(set(change[0]) | set(tl.flush())), change[1])
+        return 0, change
+    except CommandError as e:
+        err.write(f"Error: {e}\n")
+        return 1, None
+    except BrokenPipeError:
+        # Reader went away (e.g. --list piped into head): stop quietly
+        return 0, None
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Opt-in link unfurling for whatsup.
+
+Fetches page titles and Open Graph metadata for --link URLs on a small pool
+of daemon threads with hard time limits, so a post never waits longer than
+its budget. Results are kept in data/unfurl.json, keyed by URL and evicted
+by age. Links that miss the budget are recorded as pending; a detached
+`python3 unfurl.py URL...` keeps fetching them into the cache, then fills
+the titles into their entries and commits them (through the daemon when
+one is running). A later post backfills anything it left pending.
+"""
+
+import fcntl
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from html.parser import HTMLParser
+from pathlib import Path
+
+CACHE_PATH = "data/unfurl.json"
+CACHE_TTL = 7 * 86400      # seconds a fetched result stays fresh
+FAILURE_TTL = 3600         # seconds before a failed fetch is retried
+CACHE_MAX = 2000           # URLs kept; oldest are evicted first
+WORKERS = 4                # concurrent fetches
+TIMEOUT = 5.0              # overall limit for one background fetch, seconds
+MAX_BYTES = 512 * 1024     # HTML read while looking for <head> metadata
+USER_AGENT = "whatsup-unfurl/1.0 (+https://github.com)"
+
+
+class _MetaParser(HTMLParser):
+    """Collects <title> and og:/twitter: metadata until </head>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.title = ""
+        self.done = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            a = dict(attrs)
+            key = (a.get("property") or a.get("name") or "").lower()
+            content = (a.get("content") or "").strip()
+            if content and key in ("og:title", "og:description", "og:image",
+                                   "og:site_name", "twitter:title", "description"):
+                self.meta.setdefault(key, content)
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+def fetch(url, timeout=TIMEOUT, max_bytes=MAX_BYTES):
+    """Fetch url and return its metadata dict (title, description, image,
+    siteName; only the keys that were found). Raises on failure."""
+    if not url.startswith(("http://", "https://")):
+        raise ValueError(f"not an http(s) URL: {url}")
+    deadline = time.monotonic() + timeout
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT,
+                                               "Accept": "text/html,*/*;q=0.5"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        if "html" not in resp.headers.get("Content-Type", "text/html"):
+            return {}
+        charset = resp.headers.get_content_charset() or "utf-8"
+        parser = _MetaParser()
+        read = 0
+        while not parser.done and read < max_bytes:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"unfurl of {url} exceeded {timeout}s")
+            chunk = resp.read(16384)
+            if not chunk:
+                break
+            read += len(chunk)
+            parser.feed(chunk.decode(charset, "replace"))
+
+    m = parser.meta
+    result = {}
+    title = m.get("og:title") or m.get("twitter:title") or " ".join(parser.title.split())
+    if title:
+        result["title"] = title
+    if m.get("og:description") or m.get("description"):
+        result["description"] = m.get("og:description") or m.get("description")
+    if m.get("og:image"):
+        result["image"] = urllib.parse.urljoin(url, m["og:image"])
+    if m.get("og:site_name"):
+        result["siteName"] = m["og:site_name"]
+    return result
+
+
+def unfurl_many(urls, budget, timeout=None, workers=WORKERS):
+    """Fetch urls concurrently, returning {url: meta} for those that finished
+    within budget seconds (meta is None for fetches that failed).
+
+    Workers are daemon threads, so stragglers never hold up the caller or
+    interpreter exit.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    timeout = budget if timeout is None else timeout
+    todo = queue.Queue()
+    for url in urls:
+        todo.put(url)
+    results = {}
+    done = threading.Condition()
+
+    def worker():
+        while True:
+            try:
+                url = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                meta = fetch(url, timeout=timeout)
+            except Exception:
+                meta = None
+            with done:
+                results[url] = meta
+                done.notify_all()
+
+    for _ in range(min(workers, len(urls))):
+        threading.Thread(target=worker, daemon=True).start()
+
+    deadline = time.monotonic() + budget
+    with done:
+        while len(results) < len(urls):
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            done.wait(left)
+        return dict(results)
+
+
+class Cache:
+    """data/unfurl.json: {"links": {url: {"fetched", "meta"}}, "pending": {id: {date, url}}}.
+
+    save() re-reads the file under a lock and merges, so the background
+    fetcher and a concurrent post do not drop each other's results.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = Path(path)
+        self.links = {}
+        self.pending = {}
+        self._dirty_links = {}
+        self._added_pending = {}
+        self._dropped_pending = set()
+        data = self._read()
+        self.links = data.get("links", {})
+        self.pending = data.get("pending", {})
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text())
+        except Exception:
+            return {}
+
+    def get(self, url):
+        """Cached metadata for url if still fresh; {} for a recent failure; else None."""
+        rec = self.links.get(url)
+        if rec is None:
+            return None
+        ttl = CACHE_TTL if rec.get("meta") is not None else FAILURE_TTL
+        if time.time() - rec.get("fetched", 0) > ttl:
+            return None
+        return rec.get("meta") or {}
+
+    def put(self, url, meta):
+        rec = {"fetched": int(time.time()), "meta": meta}
+        self.links[url] = rec
+        self._dirty_links[url] = rec
+
+    def add_pending(self, entry_id, date, url, since=None):
+        rec = {"date": date, "url": url, "since": int(time.time() if since is None else since)}
+        self.pending[entry_id] = rec
+        self._added_pending[entry_id] = rec
+
+    def drop_pending(self, entry_id):
+        self.pending.pop(entry_id, None)
+        self._added_pending.pop(entry_id, None)
+        self._dropped_pending.add(entry_id)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            on_disk = self._read()
+            links = on_disk.get("links", {})
+            links.update(self._dirty_links)
+            now = time.time()
+            links = {u: r for u, r in links.items()
+                     if now - r.get("fetched", 0) <= max(CACHE_TTL, FAILURE_TTL)}
+            if len(links) > CACHE_MAX:
+                keep = sorted(links, key=lambda u: links[u].get("fetched", 0))[-CACHE_MAX:]
+                links = {u: links[u] for u in keep}
+            pending = on_disk.get("pending", {})
+            pending.update(self._added_pending)
+            for eid in self._dropped_pending:
+                pending.pop(eid, None)
+
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps({"links": links, "pending": pending},
+                                      indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
+            self.links, self.pending = links, pending
+            self._dirty_links = {}
+            self._added_pending = {}
+            self._dropped_pending = set()
+        finally:
+            os.close(lock_fd)
+
+
+def link_record(url, meta):
+    """The entry's link object for url, using meta when available."""
+    rec = {"url": url, "title": url.rstrip("/").split("/")[-1] or url}
+    for key in ("title", "description", "image", "siteName"):
+        if meta and meta.get(key):
+            rec[key] = meta[key]
+    return rec
+
+
+def warm_in_background(urls, root="."):
+    """Detach a `python3 unfurl.py URL...` that fills root's cache for urls."""
+    import subprocess
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), *urls], cwd=root,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def backfill(root="."):
+    """Fill cached titles into root's pending entries and commit them."""
+    import io
+
+    import daemon
+    import gitsync
+    import timeline
+
+    out = io.StringIO()
+    if daemon.run("backfill", {}, root=root, out=out, err=out) is not None:
+        return
+    status, change = timeline.run("backfill", {}, timeline.for_root(root), out, out)
+    if status == 0 and change:
+        gitsync.commit(*change, root=root, capture=True)
+
+
+if __name__ == "__main__":
+    # Background fetcher: cache.put() whatever resolves within TIMEOUT,
+    # then patch the entries that were posted with a placeholder title.
+    cache = Cache()
+    results = unfurl_many(sys.argv[1:], budget=TIMEOUT + 1, timeout=TIMEOUT)
+    for url, meta in results.items():
+        cache.put(url, meta)
+    cache.save()
+    backfill(".")
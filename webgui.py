@@ -1,23 +1,75 @@
 #!/usr/bin/env python3
 """WhatsUp Web GUI -- browser-based interface using stdlib http.server."""
 
+import functools
+import hashlib
 import http.server
+import io
 import json
+import math
 import os
+import queue
+import re
 import subprocess
 import sys
+import threading
+import time
 import urllib.parse
 import webbrowser
-from http.server import HTTPServer
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer
 from pathlib import Path
 
+import attachments
+import daemon
+import feeds
+import gitsync
+import storage
+import timeline
+
 SCRIPT_DIR = Path(__file__).resolve().parent
 PORT = 9000
 
+POLL_INTERVAL = 1.0   # seconds between scans of data/ for outside changes
+HEARTBEAT = 15        # seconds between keep-alive comments on idle event streams
+EVENT_BACKLOG = 256   # events kept for Last-Event-ID replay (and per-client queue size)
+SNAPSHOT_DAYS = 64    # parsed day files kept in memory for diffing and serving
+
+MAX_OPEN_TIMELINES = 128  # hosted timelines kept loaded at once (--timelines)
+HOST_CACHE_DAYS = 2048    # parsed day files cached across all loaded timelines
+WRITER_CACHE_DAYS = 4     # of each hosted timeline's share, days its writer keeps
+IDLE_SECONDS = 600        # a timeline nobody is watching is unloaded after this
+TIMELINE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+KEEPALIVE_IDLE = 15.0     # seconds an idle persistent connection is kept open
+KEEPALIVE_REQUESTS = 100  # requests served on one connection before it is closed
+
+MAX_JSON_BYTES = 1 << 20             # largest accepted JSON request body
+MAX_UPLOAD_BYTES = 256 * (1 << 20)   # largest accepted attachment upload
+UPLOAD_CHUNK = 1 << 16               # bytes read from the socket at a time
+UPLOAD_TYPES = {".pdf": "pdf", ".png": "image", ".jpg": "image", ".jpeg": "image",
+                ".gif": "image", ".webp": "image"}
+WRITE_QUEUE = 16          # writes admitted per timeline at once, one running (--write-queue)
+WRITE_WAIT = 20.0         # seconds an admitted write may wait for its turn
+WRITE_RATE = 2.0          # sustained writes per second per client (--write-rate, 0 = no limit)
+WRITE_BURST = 10          # writes a client may send back to back
+IDEMPOTENCY_KEYS = 1024   # answered Idempotency-Keys remembered per timeline
+IDEMPOTENCY_TTL = 24 * 3600
+MAX_RANGE_DAYS = 400      # days one /api/entries?from=&to= or ?dates= request may return
+DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+ASSET_PATH = re.compile(r"^/assets/[0-9a-f]{64}\.[a-z0-9]+$")
+FEED_PATHS = {"/" + p for p in feeds.PATHS}
+
 # ── CLI runner ────────────────────────────────────────────────────────
 
 def run_cli(args):
     """Run ./whatsup with args, returns (ok, stdout, stderr)."""
+    # A running whatsup daemon answers without starting a process
+    result = daemon.run_cli(args)
+    if result is not None:
+        return result
     try:
         cmd = ["bash", str(SCRIPT_DIR / "whatsup")] + args
         result = subprocess.run(
@@ -29,6 +81,614 @@ def run_cli(args):
     except Exception as e:
         return (False, "", str(e))
 
+# ── Multipart uploads ─────────────────────────────────────────────────
+
+class MultipartReader:
+    """Incremental multipart/form-data parser over a request body.
+
+    parts() yields (headers, body) pairs where body is a generator of byte
+    chunks; only one chunk plus a delimiter's worth of lookahead is held
+    in memory at a time. Each body must be consumed (or is drained) before
+    the next part is read.
+    """
+
+    def __init__(self, rfile, length, boundary):
+        self.rfile = rfile
+        self.remaining = length
+        self.delim = b"\r\n--" + boundary
+        # A leading CRLF lets the first boundary match the same delimiter
+        self.buf = b"\r\n"
+
+    def _fill(self):
+        if self.remaining <= 0:
+            return False
+        data = self.rfile.read(min(UPLOAD_CHUNK, self.remaining))
+        if not data:
+            self.remaining = 0
+            return False
+        self.remaining -= len(data)
+        self.buf += data
+        return True
+
+    def _body(self):
+        keep = len(self.delim) - 1
+        while True:
+            i = self.buf.find(self.delim)
+            if i >= 0:
+                chunk, self.buf = self.buf[:i], self.buf[i + len(self.delim):]
+                if chunk:
+                    yield chunk
+                return
+            if len(self.buf) > keep:
+                chunk, self.buf = self.buf[:-keep], self.buf[-keep:]
+                yield chunk
+            if not self._fill():
+                raise ValueError("truncated multipart body")
+
+    def parts(self):
+        for _ in self._body():
+            pass  # preamble
+        while True:
+            while len(self.buf) < 2 and self._fill():
+                pass
+            if self.buf.startswith(b"--"):
+                return
+            while b"\r\n\r\n" not in self.buf:
+                if len(self.buf) > UPLOAD_CHUNK or not self._fill():
+                    raise ValueError("malformed multipart headers")
+            head, self.buf = self.buf.split(b"\r\n\r\n", 1)
+            headers = {}
+            for line in head.decode("utf-8", "replace").split("\r\n"):
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+            body = self._body()
+            yield headers, body
+            for _ in body:
+                pass
+
+    def drain(self):
+        """Read whatever is left of the request body (the epilogue), so the
+        connection can carry another request."""
+        while self._fill():
+            self.buf = b""
+
+
+def _disposition(headers):
+    """Parameters of a part's Content-Disposition header (name, filename)."""
+    return dict(re.findall(r'(\w+)="([^"]*)"', headers.get("content-disposition", "")))
+
+# ── Live updates ──────────────────────────────────────────────────────
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def _read_json(path, default):
+    try:
+        return json.loads(Path(path).read_text())
+    except Exception:
+        return default
+
+
+def _read_entries(path):
+    try:
+        return storage.loads(Path(path).read_text())
+    except Exception:
+        return []
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=EVENT_BACKLOG)
+        self.dropped = False
+
+
+class EventHub:
+    """Fans change events out to every connected /api/events stream.
+
+    Events are (seq, kind, data) tuples. A short backlog lets a reconnecting
+    client resume from its Last-Event-ID; a client that is too far behind
+    (or too slow to drain its queue) is told to reset and refetch instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._backlog = deque(maxlen=EVENT_BACKLOG)
+        self._seq = 0
+
+    def publish(self, kind, data):
+        with self._lock:
+            self._seq += 1
+            event = (self._seq, kind, data)
+            self._backlog.append(event)
+            for sub in list(self._subscribers):
+                try:
+                    sub.queue.put_nowait(event)
+                except queue.Full:
+                    sub.dropped = True
+                    self._subscribers.discard(sub)
+            return event
+
+    def subscribe(self, last_id=None):
+        """Register a stream; returns (subscriber, replay) where replay is the
+        list of missed events, or None if the client must reset."""
+        sub = _Subscriber()
+        with self._lock:
+            replay = []
+            if last_id is not None and last_id != self._seq:
+                if last_id < self._seq and self._backlog and self._backlog[0][0] <= last_id + 1:
+                    replay = [e for e in self._backlog if e[0] > last_id]
+                else:
+                    replay = None
+            self._subscribers.add(sub)
+        return sub, replay
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class DataWatcher:
+    """Follows data/ on disk and publishes fine-grained change events.
+
+    Day files are compared by (mtime, size); a changed day is diffed by entry
+    ID against its last parsed copy, which (serialized once) also serves
+    /api/entries. Writes
+    made through this server call check() directly so their events go out
+    before the response; a background poll picks up everything else.
+    """
+
+    def __init__(self, data_dir, hub, capacity=SNAPSHOT_DAYS):
+        self.data_dir = Path(data_dir)
+        self.hub = hub
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._sigs = {}                 # date -> signature of the day file
+        self._days = OrderedDict()      # date -> (signature, entries, JSON bytes or None), LRU
+        self._manifest_sig = None
+        self._manifest = []
+        with self._lock:
+            for date, sig in self._scan().items():
+                self._sigs[date] = sig
+            self._sync_manifest(publish=False)
+
+    def start(self):
+        def poll():
+            while True:
+                time.sleep(POLL_INTERVAL)
+                try:
+                    self.check()
+                except Exception as e:
+                    sys.stderr.write(f"[webgui] watcher: {e}\n")
+
+        threading.Thread(target=poll, daemon=True).start()
+
+    def _day_path(self, date):
+        return self.data_dir / "entries" / f"{date}.json"
+
+    def _scan(self):
+        sigs = {}
+        try:
+            with os.scandir(self.data_dir / "entries") as it:
+                for de in it:
+                    if de.name.endswith(".json"):
+                        st = de.stat()
+                        sigs[de.name[:-5]] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return sigs
+
+    def manifest(self):
+        with self._lock:
+            self._sync_manifest()
+            return self._manifest
+
+    def entries(self, date):
+        if not DATE.match(date):
+            return []   # never a path outside entries/, nor a cache key
+        with self._lock:
+            return self._sync_day(date, _signature(self._day_path(date)))
+
+    def entries_json(self, date):
+        """entries(date) as JSON bytes, encoded once per version of the file."""
+        if not DATE.match(date):
+            return b"[]"
+        with self._lock:
+            entries = self._sync_day(date, _signature(self._day_path(date)))
+            hit = self._days.get(date)
+            if hit is None:
+                return json.dumps(entries).encode("utf-8")
+            if hit[2] is None:
+                hit = self._days[date] = (hit[0], hit[1], json.dumps(entries).encode("utf-8"))
+            return hit[2]
+
+    def find(self, entry_id):
+        """Locate an entry by ID, newest days first. Returns (date, entry)."""
+        with self._lock:
+            searched = set()
+            for date in reversed(list(self._days)):
+                searched.add(date)
+                for entry in self._days[date][1]:
+                    if entry.get("id") == entry_id:
+                        return date, entry
+            for date in sorted(self._sigs, reverse=True):
+                if date in searched:
+                    continue
+                for entry in self._sync_day(date, self._sigs[date]):
+                    if entry.get("id") == entry_id:
+                        return date, entry
+        return None, None
+
+    def day(self, date):
+        """The manifest record for date, or a removal marker."""
+        for rec in self.manifest():
+            if rec["date"] == date:
+                return rec
+        return {"date": date, "removed": True}
+
+    def check(self):
+        """Rescan data/ and publish events for everything that changed."""
+        with self._lock:
+            current = self._scan()
+            for date in set(self._sigs) | set(current):
+                if self._sigs.get(date) != current.get(date):
+                    self._sync_day(date, current.get(date))
+            self._sync_manifest()
+
+    def _sync_day(self, date, sig):
+        """Bring the parsed copy of date up to sig, publishing what changed."""
+        known = self._sigs.get(date)
+        old = self._days.get(date)
+        if old is not None and old[0] == sig:
+            self._days.move_to_end(date)
+            return old[1]
+
+        entries = _read_entries(self._day_path(date)) if sig else []
+        if sig is None:
+            self._sigs.pop(date, None)
+            self._days.pop(date, None)
+        else:
+            self._sigs[date] = sig
+            self._days[date] = (sig, entries, None)
+            self._days.move_to_end(date)
+            while len(self._days) > self.capacity:
+                self._days.popitem(last=False)
+
+        if known == sig:
+            return entries  # first parse of an unchanged day
+        if old is None and known is not None:
+            # Changed, but we hold no copy to diff against
+            self.hub.publish("day-reset", {"date": date, "entries": entries})
+        else:
+            self._publish_diff(date, old[1] if old else [], entries)
+        return entries
+
+    def _publish_diff(self, date, old, new):
+        before = {e.get("id"): e for e in old}
+        for entry in new:
+            prev = before.pop(entry.get("id"), None)
+            if prev is None:
+                self.hub.publish("entry-added", {"date": date, "entry": entry})
+            elif prev != entry:
+                self.hub.publish("entry-updated", {"date": date, "entry": entry})
+        for eid in before:
+            self.hub.publish("entry-deleted", {"date": date, "id": eid})
+
+    def _sync_manifest(self, publish=True):
+        path = self.data_dir / "index.json"
+        sig = _signature(path)
+        if sig == self._manifest_sig:
+            return
+        manifest = _read_json(path, []) if sig else []
+        if publish:
+            before = {m["date"]: m for m in self._manifest}
+            for rec in manifest:
+                if before.pop(rec["date"], None) != rec:
+                    self.hub.publish("day-updated", {"day": rec})
+            for date in before:
+                self.hub.publish("day-removed", {"date": date})
+        self._manifest_sig = sig
+        self._manifest = manifest
+
+
+# ── Admission control ─────────────────────────────────────────────────
+
+class Overloaded(Exception):
+    """A write was turned away; retry_after is the suggested wait in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many writes in progress, try again later")
+        self.retry_after = retry_after
+
+
+class WriteQueue:
+    """Bounds one timeline's writes.
+
+    At most depth writes are admitted at a time. They run one after
+    another, and each may wait up to `wait` seconds for its turn. Past
+    either limit a write is refused at once with an estimate of when to
+    come back, instead of piling up behind the CLI timeout.
+    """
+
+    def __init__(self, depth=WRITE_QUEUE, wait=WRITE_WAIT):
+        self.depth = depth
+        self.wait = wait
+        self.pending = 0
+        self.seconds = 1.0     # moving average of one write's duration
+        self._lock = threading.Lock()
+        self._turn = threading.Lock()
+
+    def retry_after(self):
+        with self._lock:
+            return max(1, math.ceil(self.seconds * max(1, self.pending)))
+
+    @contextmanager
+    def slot(self):
+        """Wait for this write's turn; yields False if it was refused."""
+        with self._lock:
+            full = self.pending >= self.depth
+            if not full:
+                self.pending += 1
+        if full:
+            yield False
+            return
+        try:
+            if not self._turn.acquire(timeout=self.wait):
+                yield False
+                return
+            start = time.monotonic()
+            try:
+                yield True
+            finally:
+                self._turn.release()
+                with self._lock:
+                    self.seconds = 0.8 * self.seconds + 0.2 * (time.monotonic() - start)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+class RateLimiter:
+    """A token bucket per client: rate writes a second, burst at once."""
+
+    def __init__(self, rate=WRITE_RATE, burst=WRITE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()   # client -> (tokens, time), least recent first
+
+    def take(self, client):
+        """0 if client may write now, else the seconds until it may."""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[client] = (tokens - 1 if tokens >= 1 else tokens, now)
+            # A bucket that has refilled is the same as no bucket
+            refill = self.burst / self.rate
+            while self._buckets:
+                oldest, (_, t) = next(iter(self._buckets.items()))
+                if now - t < refill:
+                    break
+                del self._buckets[oldest]
+        return wait
+
+
+class IdempotencyCache:
+    """Answers to recent writes by Idempotency-Key, so a retried write is
+    answered again instead of being applied twice."""
+
+    def __init__(self, capacity=IDEMPOTENCY_KEYS, ttl=IDEMPOTENCY_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._done = OrderedDict()   # key -> (expires, fingerprint, status, body)
+        self._running = {}           # key -> fingerprint
+
+    def begin(self, key, fingerprint):
+        """("new", None) if the caller should perform the write, ("done",
+        (status, body)) to repeat an earlier answer, or ("running", None) /
+        ("mismatch", None) if key is in use by another request."""
+        now = time.monotonic()
+        with self._lock:
+            while self._done and next(iter(self._done.values()))[0] < now:
+                self._done.popitem(last=False)
+            if key in self._running:
+                return ("running" if self._running[key] == fingerprint else "mismatch"), None
+            if key in self._done:
+                _, fp, status, body = self._done[key]
+                return ("done", (status, body)) if fp == fingerprint else ("mismatch", None)
+            self._running[key] = fingerprint
+            return "new", None
+
+    def finish(self, key, answer):
+        """Record the (status, body) answered for key; None forgets it, so
+        a retry performs the write."""
+        with self._lock:
+            fingerprint = self._running.pop(key, None)
+            if answer is not None and fingerprint is not None:
+                self._done[key] = (time.monotonic() + self.ttl, fingerprint, *answer)
+                while len(self._done) > self.capacity:
+                    self._done.popitem(last=False)
+
+
+# ── Hosted timelines ──────────────────────────────────────────────────
+
+class Site:
+    """One timeline served by this process: its event hub, watcher and write path.
+
+    The default site is this checkout, written through the CLI (or its
+    daemon) as always. Hosted sites are other repos, so they are written
+    in-process: a Timeline with a small cache of its own (taken out of
+    cache_days, so the site stays within its share), a single-worker queue
+    that applies writes in order, and a git syncer that commits behind them.
+    """
+
+    def __init__(self, root, prefix="", cache_days=SNAPSHOT_DAYS, hosted=False, write_queue=WRITE_QUEUE):
+        self.root = Path(root)
+        self.prefix = prefix
+        self.hub = EventHub()
+        if hosted:
+            # The watcher serves reads; the writer only needs the days it writes
+            cache_days -= WRITER_CACHE_DAYS
+        self.watcher = DataWatcher(self.root / "data", self.hub, cache_days)
+        self.write_queue = WriteQueue(write_queue)
+        self.idempotency = IdempotencyCache()
+        self.last_used = time.monotonic()
+        self.timeline = self.writes = self.syncer = None
+        if hosted:
+            self.timeline = timeline.for_root(self.root, cache_days=WRITER_CACHE_DAYS)
+            self.writes = ThreadPoolExecutor(max_workers=1)
+
+    def run(self, args):
+        """Run whatsup args against this timeline; returns (ok, stdout, stderr)."""
+        if self.timeline is None:
+            return run_cli(args)
+        parsed = daemon.parse_args(args)
+        if parsed is None:
+            return (False, "", "Unsupported command")
+        try:
+            return self.writes.submit(self._run, *parsed).result()
+        except RuntimeError:
+            return (False, "", "Timeline was unloaded, try again")
+
+    def _run(self, command, opts):
+        out, err = io.StringIO(), io.StringIO()
+        try:
+            status, change = timeline.run(command, opts, self.timeline, out, err)
+        except Exception as e:
+            status, change = 1, None
+            err.write(f"Error: {e}\n")
+        if status == 0 and change and (self.root / ".git").exists():
+            # Started on first write, so read-only timelines cost no thread
+            if self.syncer is None:
+                self.syncer = gitsync.GitSyncer(str(self.root))
+            self.syncer.submit(*change)
+        return (status == 0, out.getvalue(), err.getvalue())
+
+    def watched(self):
+        return self.hub.subscriber_count() > 0
+
+    def close(self):
+        if self.writes is not None:
+            self.writes.shutdown(wait=True)
+            if self.syncer is not None:
+                self.syncer.close()
+
+
+class TimelineHost:
+    """Maps request paths to Sites.
+
+    Without a base directory there is one site, this checkout, at "/".
+    With one, every subdirectory holding a data/ directory is a timeline
+    served under /t/<name>/. Those are loaded on first use and kept in an
+    LRU of at most max_open; each gets an equal share of HOST_CACHE_DAYS,
+    so memory stays bounded however many exist. Timelines nobody is
+    watching are unloaded when the LRU is full or after IDLE_SECONDS.
+    One poll thread checks the watched ones for outside changes.
+
+    Each site bounds its own writes (write_queue); the per-client write
+    rate limit is shared by all of them.
+    """
+
+    def __init__(self, base=None, max_open=MAX_OPEN_TIMELINES, idle=IDLE_SECONDS,
+                 write_queue=WRITE_QUEUE, write_rate=WRITE_RATE):
+        self.base = Path(base).resolve() if base else None
+        self.max_open = max_open
+        self.idle = idle
+        self.cache_days = max(2 * WRITER_CACHE_DAYS, HOST_CACHE_DAYS // max_open)
+        self.write_queue = write_queue
+        self.limiter = RateLimiter(write_rate)
+        self._lock = threading.Lock()
+        self._sites = OrderedDict()     # name -> Site, least recently used first
+        self.single = Site(SCRIPT_DIR, write_queue=write_queue) if self.base is None else None
+
+    def start(self):
+        def poll():
+            while True:
+                time.sleep(POLL_INTERVAL)
+                for site in self._loaded():
+                    if site is self.single or site.watched():
+                        try:
+                            site.watcher.check()
+                        except Exception as e:
+                            sys.stderr.write(f"[webgui] watcher: {e}\n")
+                self._release(idle_only=True)
+
+        threading.Thread(target=poll, daemon=True).start()
+
+    def names(self):
+        """Hosted timeline names, sorted."""
+        try:
+            return sorted(d.name for d in self.base.iterdir()
+                          if TIMELINE_NAME.match(d.name) and (d / "data").is_dir())
+        except OSError:
+            return []
+
+    def resolve(self, path):
+        """(site, path within the site) for a request path; site is None if
+        nothing matches."""
+        if self.single is not None:
+            return self.single, path
+        m = re.match(r"^/t/([^/]+)(/.*)?$", path)
+        if not m:
+            return None, path
+        return self.get(m.group(1)), m.group(2) or ""
+
+    def get(self, name):
+        if not TIMELINE_NAME.match(name):
+            return None
+        with self._lock:
+            site = self._sites.get(name)
+            if site is None:
+                root = self.base / name
+                if not (root / "data").is_dir():
+                    return None
+                site = Site(root, f"/t/{name}", self.cache_days, hosted=True,
+                            write_queue=self.write_queue)
+                self._sites[name] = site
+            self._sites.move_to_end(name)
+            site.last_used = time.monotonic()
+            over = len(self._sites) > self.max_open
+        if over:
+            self._release(idle_only=False)
+        return site
+
+    def _loaded(self):
+        with self._lock:
+            sites = list(self._sites.values())
+        return sites + ([self.single] if self.single else [])
+
+    def _release(self, idle_only):
+        """Unload unwatched timelines: idle ones, and LRU ones while over capacity."""
+        now = time.monotonic()
+        closing = []
+        with self._lock:
+            excess = len(self._sites) - self.max_open
+            for name, site in list(self._sites.items()):
+                if site.watched():
+                    continue
+                if (not idle_only and excess > 0) or now - site.last_used > self.idle:
+                    del self._sites[name]
+                    closing.append(site)
+                    excess -= 1
+        for site in closing:
+            threading.Thread(target=site.close, daemon=True).start()
+
+
 # ── HTML page ─────────────────────────────────────────────────────────
 
 HTML_PAGE = r"""<!DOCTYPE html>
@@ -102,6 +762,8 @@ HTML_PAGE = r"""<!DOCTYPE html>
       color: var(--text);
     }
     .compose-row input[type="text"] { width: 120px; }
+    .compose-row input[type="file"] { font-size: 11px; max-width: 180px; color: var(--muted); }
+    .compose-file-name { font-size: 12px; color: var(--text); }
     .compose-row input[type="text"].wide { width: 200px; }
     .compose-btn {
       font-family: 'IBM Plex Mono', 'Courier New', monospace;
@@ -215,8 +877,10 @@ const WG = {
   manifest: [],
   currentDate: null,
   entries: [],
+  dayCache: {},
   tags: [],
   editId: null,
+  file: null,
 
   MOODS: ['', 'focused', 'happy', 'tired', 'excited', 'frustrated', 'chill', 'thinking', 'creative'],
   MOOD_EMOJI: { focused:'\u{1F3AF}', happy:'\u{1F60A}', tired:'\u{1F634}', excited:'\u{1F680}', frustrated:'\u{1F624}', chill:'\u{1F60E}', thinking:'\u{1F914}', creative:'\u{1F3A8}' },
@@ -224,8 +888,8 @@ const WG = {
   async init() {
     try {
       const [config, manifest] = await Promise.all([
-        fetch('/api/config').then(r => r.ok ? r.json() : null),
-        fetch('/api/manifest').then(r => r.ok ? r.json() : [])
+        fetch('api/config').then(r => r.ok ? r.json() : null),
+        fetch('api/manifest').then(r => r.ok ? r.json() : [])
       ]);
       this.config = config || { name: 'WhatsUp', bio: '', avatar: '', links: [], timezone: 'UTC' };
       this.manifest = manifest;
@@ -238,6 +902,7 @@ const WG = {
       }
 
       await this.loadAndRender();
+      this.connectEvents();
     } catch (e) {
       document.getElementById('app').textContent = 'Failed to load: ' + e.message;
     }
@@ -249,16 +914,43 @@ const WG = {
   },
 
   async loadAndRender() {
-    const res = await fetch('/api/entries?date=' + this.currentDate);
-    this.entries = res.ok ? await res.json() : [];
-    this.render();
+    const date = this.currentDate;
+    const cached = this.dayCache[date];
+    if (cached) {
+      this.entries = cached;
+      this.render();
+    }
+    // The day (unless cached) and its neighbours in one request, so stepping through is instant
+    const missing = [date, ...this.neighbors()].filter(d => d && !this.dayCache[d]);
+    if (missing.length) {
+      const res = await fetch('api/entries?dates=' + missing.join(','));
+      for (const d of res.ok ? await res.json() : []) this.cacheDay(d.date, d.entries);
+    }
+    if (!cached && date === this.currentDate) {
+      this.entries = this.dayCache[date] || [];
+      this.render();
+    }
+    // The shown day lives in this.entries, patched by live updates
+    delete this.dayCache[date];
   },
 
-  render() {
+  cacheDay(date, entries) {
+    delete this.dayCache[date];
+    this.dayCache[date] = entries;
+    const dates = Object.keys(this.dayCache);
+    if (dates.length > 32) delete this.dayCache[dates[0]];
+  },
+
+  neighbors() {
     const sorted = this.manifest.map(m => m.date).sort();
     const idx = sorted.indexOf(this.currentDate);
     const prev = idx > 0 ? sorted[idx - 1] : null;
     const next = idx >= 0 && idx < sorted.length - 1 ? sorted[idx + 1] : null;
+    return [prev, next];
+  },
+
+  render() {
+    const [prev, next] = this.neighbors();
 
     const app = document.getElementById('app');
     // Build full page using pre-escaped strings, then set via setContent
@@ -267,18 +959,30 @@ const WG = {
     html += this.renderSidebar();
     html += '<div class="day-content">';
     html += this.renderCompose();
-    html += this.renderTimeline();
+    html += '<div id="timeline-wrap">' + this.renderTimeline() + '</div>';
     html += '</div></div>';
 
     this.setContent(app, html);
     this.bindEvents();
   },
 
+  /** Re-render everything but the compose panel, so a draft survives live updates. */
+  renderLive() {
+    const app = document.getElementById('app');
+    const wrap = document.getElementById('timeline-wrap');
+    if (!wrap) { this.render(); return; }
+    const [prev, next] = this.neighbors();
+    this.setOuter(app.querySelector('.nav-bar'), this.navBar(prev, next));
+    this.setOuter(app.querySelector('.mood-sidebar'), this.renderSidebar());
+    this.setContent(wrap, this.renderTimeline());
+  },
+
   /**
    * Sets element content from trusted, pre-escaped HTML strings.
    * All user-supplied data is escaped via esc() before being included.
    */
   setContent(el, html) { el.innerHTML = html; },
+  setOuter(el, html) { if (el) el.outerHTML = html; },
 
   navBar(prev, next) {
     let dates = [...this.manifest].sort((a, b) => b.date.localeCompare(a.date));
@@ -353,6 +1057,10 @@ const WG = {
     html += '<div class="compose-row">';
     html += '<label>Reply:</label><input type="text" id="compose-reply" placeholder="entry id">';
     html += '<label>GIF:</label><input type="text" id="compose-gif" class="wide" placeholder="giphy url">';
+    if (!this.editId) {
+      html += '<label>File:</label><input type="file" id="compose-file" accept=".pdf,image/*">';
+      if (this.file) html += '<span class="compose-file-name">' + this.esc(this.file.name) + '</span>';
+    }
     html += '<span style="flex:1"></span>';
     html += '<button class="compose-btn" onclick="WG.clearCompose()">Clear</button>';
     html += '<button class="compose-btn primary" onclick="WG.doPost()">' + (this.editId ? 'Save' : 'Post') + '</button>';
@@ -405,7 +1113,8 @@ const WG = {
         if (a.type === 'gif' || a.type === 'image') {
           if (skipGif) return;
           const url = this.giphyDirect(a.url);
-          card += '<img src="' + this.esc(url) + '" alt="" class="gif-embed" loading="lazy">';
+          const dims = a.width && a.height ? ' width="' + (+a.width) + '" height="' + (+a.height) + '"' : '';
+          card += '<img src="' + this.esc(url) + '" alt=""' + dims + ' class="gif-embed" loading="lazy">';
         } else if (a.type === 'pdf') {
           card += '<a href="' + this.esc(a.url) + '" class="attachment-link" target="_blank" rel="noopener noreferrer">\u{1F4C4} ' + this.esc(a.title || 'PDF') + '</a>';
         }
@@ -452,25 +1161,35 @@ const WG = {
       body.reply = document.getElementById('compose-reply').value.trim();
       body.gif = document.getElementById('compose-gif').value.trim();
       body.tags = this.tags;
+      if (this.file) {
+        this.status('Uploading ' + this.file.name + '...');
+        try {
+          const up = await this.upload(this.file);
+          if (!up.ok) { this.status('Error: ' + up.error, true); return; }
+          body.attachment = { type: up.type, url: up.url, name: up.name };
+        } catch (e) {
+          this.status('Error: ' + e.message, true);
+          return;
+        }
+      }
     }
 
-    const endpoint = this.editId ? '/api/edit' : '/api/post';
+    const endpoint = this.editId ? 'api/edit' : 'api/post';
     this.status(this.editId ? 'Saving edit...' : 'Posting...');
 
     try {
-      const res = await fetch(endpoint, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(body)
-      });
-      const data = await res.json();
+      const data = await this.write(endpoint, body);
       if (data.ok) {
         this.status(data.message, false, true);
         this.editId = null;
         this.tags = [];
-        const mRes = await fetch('/api/manifest');
-        this.manifest = mRes.ok ? await mRes.json() : this.manifest;
-        await this.loadAndRender();
+        this.file = null;
+        if (data.entry) {
+          this.applyWrite(data);
+          this.render();
+        } else {
+          await this.reload(true);
+        }
       } else {
         this.status('Error: ' + data.error, true);
       }
@@ -479,6 +1198,37 @@ const WG = {
     }
   },
 
+  /** POST a write. A busy server (409/429/503) or a lost connection is
+      retried after Retry-After, under one Idempotency-Key so the write
+      is applied at most once. */
+  async write(endpoint, body) {
+    const key = Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+    for (let attempt = 0; ; attempt++) {
+      let res = null;
+      try {
+        res = await fetch(endpoint, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', 'Idempotency-Key': key },
+          body: JSON.stringify(body)
+        });
+      } catch (e) {
+        if (attempt >= 3) throw e;
+      }
+      if (res && (![409, 429, 503].includes(res.status) || attempt >= 3)) return res.json();
+      const wait = Math.min(30, parseFloat(res && res.headers.get('Retry-After')) || 2 ** attempt);
+      this.status('Server busy, retrying in ' + wait + 's...');
+      await new Promise(resolve => setTimeout(resolve, wait * 1000));
+    }
+  },
+
+  /** Send a file to /api/upload; the browser streams the multipart body. */
+  async upload(file) {
+    const form = new FormData();
+    form.append('file', file, file.name);
+    const res = await fetch('api/upload', { method: 'POST', body: form });
+    return res.json();
+  },
+
   editEntry(id) {
     const entry = this.entries.find(e => e.id === id);
     if (!entry) return;
@@ -493,17 +1243,15 @@ const WG = {
     if (!confirm('Delete entry ' + id + '?')) return;
     this.status('Deleting...');
     try {
-      const res = await fetch('/api/delete', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ id })
-      });
-      const data = await res.json();
+      const data = await this.write('api/delete', { id });
       if (data.ok) {
         this.status('Deleted ' + id, false, true);
-        const mRes = await fetch('/api/manifest');
-        this.manifest = mRes.ok ? await mRes.json() : this.manifest;
-        await this.loadAndRender();
+        if (data.day) {
+          this.applyWrite(data);
+          this.renderLive();
+        } else {
+          await this.reload();
+        }
       } else {
         this.status('Error: ' + data.error, true);
       }
@@ -515,6 +1263,7 @@ const WG = {
   clearCompose() {
     this.editId = null;
     this.tags = [];
+    this.file = null;
     this.render();
   },
 
@@ -559,6 +1308,7 @@ const WG = {
   },
 
   goDate(date) {
+    if (this.currentDate) this.cacheDay(this.currentDate, this.entries);
     this.currentDate = date;
     this.editId = null;
     this.tags = [];
@@ -572,6 +1322,72 @@ const WG = {
         if (e.key === 'Enter') { e.preventDefault(); this.addTag(); }
       });
     }
+    const fileInput = document.getElementById('compose-file');
+    if (fileInput) {
+      fileInput.addEventListener('change', () => { this.file = fileInput.files[0] || null; });
+    }
+  },
+
+  // ── Live updates ──
+
+  /** Follows /api/events and patches manifest/entries in place. */
+  connectEvents() {
+    if (!window.EventSource) return;
+    const es = new EventSource('api/events');
+    const on = (type, apply) => es.addEventListener(type, (ev) => {
+      const data = JSON.parse(ev.data);
+      // Other days are refetched when next shown
+      delete this.dayCache[data.date || (data.day && data.day.date)];
+      apply(data);
+      this.renderLive();
+    });
+    on('entry-added', d => this.upsertEntry(d.date, d.entry));
+    on('entry-updated', d => this.upsertEntry(d.date, d.entry));
+    on('entry-deleted', d => {
+      if (d.date === this.currentDate) this.entries = this.entries.filter(e => e.id !== d.id);
+    });
+    on('day-reset', d => { if (d.date === this.currentDate) this.entries = d.entries; });
+    on('day-updated', d => this.upsertDay(d.day));
+    on('day-removed', d => { this.manifest = this.manifest.filter(m => m.date !== d.date); });
+    es.addEventListener('reset', () => this.reload());
+  },
+
+  /** Apply a write response: the stored entry (or deleted id) plus the day's manifest record. */
+  applyWrite(data) {
+    if (data.entry) this.upsertEntry(data.date, data.entry);
+    if (data.deleted && data.date === this.currentDate) {
+      this.entries = this.entries.filter(e => e.id !== data.deleted);
+    }
+    if (data.day && data.day.removed) {
+      this.manifest = this.manifest.filter(m => m.date !== data.day.date);
+    } else if (data.day) {
+      this.upsertDay(data.day);
+    }
+  },
+
+  upsertEntry(date, entry) {
+    if (date !== this.currentDate) return;
+    const i = this.entries.findIndex(e => e.id === entry.id);
+    if (i >= 0) this.entries[i] = entry;
+    else this.entries.push(entry);
+  },
+
+  upsertDay(day) {
+    const i = this.manifest.findIndex(m => m.date === day.date);
+    if (i >= 0) this.manifest[i] = day;
+    else this.manifest.push(day);
+  },
+
+  async reload(full) {
+    this.dayCache = {};
+    const [mRes, eRes] = await Promise.all([
+      fetch('api/manifest'),
+      fetch('api/entries?date=' + this.currentDate)
+    ]);
+    if (mRes.ok) this.manifest = await mRes.json();
+    if (eRes.ok) this.entries = await eRes.json();
+    if (full) this.render();
+    else this.renderLive();
   },
 
   // ── Status bar ──
@@ -596,7 +1412,14 @@ const WG = {
     const m = url.match(/giphy\.com\/gifs\/[^/]+-([a-zA-Z0-9]+)\/?$/);
     return m ? 'https://media.giphy.com/media/' + m[1] + '/giphy.gif' : url;
   },
-  formatTime(ts) { return new Date(ts).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit', hour12: false }); },
+  zoneOpts(opts) {
+    const tz = this.config && this.config.timezone;
+    if (tz) {
+      try { new Intl.DateTimeFormat('en-US', { timeZone: tz }); return Object.assign({ timeZone: tz }, opts); } catch (e) {}
+    }
+    return opts;
+  },
+  formatTime(ts) { return new Date(ts).toLocaleTimeString('en-US', this.zoneOpts({ hour: '2-digit', minute: '2-digit', hour12: false })); },
   longDate(ds) {
     const [y, m, d] = ds.split('-').map(Number);
     return new Date(y, m - 1, d).toLocaleDateString('en-US', { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' });
@@ -616,8 +1439,7 @@ const WG = {
     return Math.floor(d / 30) + 'mo ago';
   },
   today() {
-    const n = new Date();
-    return n.getFullYear() + '-' + String(n.getMonth() + 1).padStart(2, '0') + '-' + String(n.getDate()).padStart(2, '0');
+    return new Intl.DateTimeFormat('en-CA', this.zoneOpts({ year: 'numeric', month: '2-digit', day: '2-digit' })).format(new Date());
   },
   linkify(text) { return text.replace(/(https?:\/\/[^\s<]+)/g, '<a href="$1" target="_blank" rel="noopener noreferrer">$1</a>'); },
   esc(s) {
@@ -634,52 +1456,302 @@ document.addEventListener('DOMContentLoaded', () => WG.init());
 
 # ── Request handler ───────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=1024)
+def _content_etag(path, mtime_ns, size):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK), b""):
+            h.update(chunk)
+    return f'"{h.hexdigest()[:20]}"'
+
+
+def file_etag(path):
+    """Strong ETag from a file's contents (hashed once per mtime and size)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return _content_etag(path, st.st_mtime_ns, st.st_size)
+
+
 class WhatsUpHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the page, the API and static files for every hosted site.
+
+    Connections are persistent (HTTP/1.1): every response is framed by
+    Content-Length, chunked encoding, or an announced close. A connection
+    is closed after KEEPALIVE_REQUESTS requests or KEEPALIVE_IDLE seconds
+    without one, so idle browsers cannot tie up the server's threads.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_IDLE
+    max_requests = KEEPALIVE_REQUESTS
+
     def __init__(self, *args, **kwargs):
+        self._served = 0
         super().__init__(*args, directory=str(SCRIPT_DIR), **kwargs)
 
     def log_message(self, format, *args):
         sys.stderr.write("[webgui] %s\n" % (format % args))
 
-    def do_GET(self):
+    def log_error(self, format, *args):
+        # An idle keep-alive connection timing out is routine
+        if not format.startswith("Request timed out"):
+            super().log_error(format, *args)
+
+    def parse_request(self):
+        self._connection_sent = False
+        ok = super().parse_request()
+        self._served += 1
+        if ok and self._served >= self.max_requests:
+            self.close_connection = True
+        return ok
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "connection":
+            self._connection_sent = True
+        super().send_header(keyword, value)
+
+    def _route(self):
+        """Find the site for this request; returns (path within it, query),
+        or None after answering requests that match no timeline."""
         parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
+        host = self.server.host
+        self.site, path = host.resolve(parsed.path)
+        if (self.site is None or path == "") and self.command == "POST":
+            # Its body goes unread
+            self.close_connection = True
+        if self.site is None:
+            if parsed.path == "/" and self.command in ("GET", "HEAD"):
+                self._respond_html(self._timeline_index(host.names()))
+            else:
+                self._respond_json({"error": "No such timeline"}, 404)
+            return None
+        if path == "":
+            # The page uses relative URLs, so it must be served from a directory
+            self.send_response(301)
+            self.send_header("Location", self.site.prefix + "/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        return path, parsed.query
+
+    def do_GET(self):
+        route = self._route()
+        if route is None:
+            return
+        path, query = route
+        watcher = self.site.watcher
 
         if path == "/":
             self._respond_html(HTML_PAGE)
         elif path == "/api/config":
-            self._serve_json_file(SCRIPT_DIR / "config.json")
+            self._serve_json_file(self.site.root / "config.json")
         elif path == "/api/manifest":
-            self._serve_json_file(SCRIPT_DIR / "data" / "index.json")
+            self._respond_json(watcher.manifest())
         elif path == "/api/entries":
-            qs = urllib.parse.parse_qs(parsed.query)
-            date = qs.get("date", [None])[0]
-            if date:
-                self._serve_json_file(SCRIPT_DIR / "data" / "entries" / f"{date}.json")
-            else:
-                self._respond_json({"error": "date parameter required"}, 400)
+            self._handle_entries(urllib.parse.parse_qs(query))
+        elif path == "/api/search":
+            self._handle_search(urllib.parse.parse_qs(query))
+        elif path == "/api/events":
+            self._stream_events()
         else:
-            super().do_GET()
+            self._serve_static(path, query, super().do_GET)
+
+    def do_HEAD(self):
+        route = self._route()
+        if route is not None:
+            self._serve_static(*route, super().do_HEAD)
+
+    def _serve_static(self, path, query, serve):
+        # Set on every request, since a persistent connection reuses the handler
+        self.directory = str(SCRIPT_DIR)
+        if self.site.timeline is not None:
+            # Hosted timelines share the app's stylesheet; only their own
+            # data/ and assets/ come from their directory
+            if path.startswith(("/data/", "/assets/")) or path in FEED_PATHS:
+                self.directory = str(self.site.root)
+            elif path != "/style.css":
+                self._respond_json({"error": "Not found"}, 404)
+                return
+            self.path = path + ("?" + query if query else "")
+        # Stored assets are named by their hash, so they never change
+        self._immutable = bool(ASSET_PATH.match(path))
+        if not self._immutable:
+            # Feed readers and the app poll these; a matching ETag costs a 304
+            self._etag = file_etag(self.translate_path(self.path))
+            wanted = {t.strip().lstrip("W/") for t in self.headers.get("If-None-Match", "").split(",")}
+            if self._etag and (self._etag in wanted or "*" in wanted):
+                self.send_response(304)
+                self.end_headers()
+                return
+        serve()
+
+    def send_response(self, code, message=None):
+        if code != 200:
+            # Only the asset itself may be cached for good, never a miss
+            self._immutable = False
+        super().send_response(code, message)
+
+    def end_headers(self):
+        if not getattr(self, "_connection_sent", True):
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            elif self.request_version == "HTTP/1.0":
+                # Only sent when the client asked to keep the connection
+                self.send_header("Connection", "keep-alive")
+        if getattr(self, "_immutable", False):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            self._immutable = False
+        if getattr(self, "_etag", None):
+            self.send_header("ETag", self._etag)
+            self._etag = None
+        super().end_headers()
 
     def do_POST(self):
-        parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
+        route = self._route()
+        if route is None:
+            return
+        path, _ = route
+
+        if path == "/api/upload":
+            self._handle_upload()
+            return
 
+        if "Transfer-Encoding" in self.headers:
+            # Bodies are read by Content-Length only
+            self.close_connection = True
+            self._respond_json({"ok": False, "error": "Content-Length required"}, 411)
+            return
         try:
             length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_JSON_BYTES:
+                self.close_connection = True
+                self._respond_json({"ok": False, "error": "Request body too large"}, 413)
+                return
             body = json.loads(self.rfile.read(length)) if length > 0 else {}
         except (json.JSONDecodeError, ValueError):
+            self.close_connection = True
             self._respond_json({"ok": False, "error": "Invalid JSON"}, 400)
             return
 
-        if path == "/api/post":
-            self._handle_post(body)
-        elif path == "/api/edit":
-            self._handle_edit(body)
-        elif path == "/api/delete":
-            self._handle_delete(body)
-        else:
+        handler = {"/api/post": self._handle_post, "/api/edit": self._handle_edit,
+                   "/api/delete": self._handle_delete}.get(path)
+        if handler is None:
             self._respond_json({"ok": False, "error": "Unknown endpoint"}, 404)
+        else:
+            self._admit_write(path, body, handler)
+
+    def _admit_write(self, path, body, handler):
+        """Run a write handler behind its Idempotency-Key and the client's
+        rate limit; the handler's answer is remembered under the key."""
+        key = self.headers.get("Idempotency-Key", "").strip()
+        idem = self.site.idempotency
+        if len(key) > 255:
+            self._respond_json({"ok": False, "error": "Idempotency-Key too long"}, 400)
+            return
+        if key:
+            fingerprint = hashlib.sha1(json.dumps([path, body], sort_keys=True).encode()).hexdigest()
+            state, answer = idem.begin(key, fingerprint)
+            if state == "done":
+                self._respond_json(answer[1], answer[0], {"Idempotent-Replayed": "true"})
+                return
+            if state == "running":
+                self._respond_json({"ok": False, "error": "A request with this Idempotency-Key "
+                                    "is in progress"}, 409, {"Retry-After": "1"})
+                return
+            if state == "mismatch":
+                self._respond_json({"ok": False, "error": "Idempotency-Key was used for "
+                                    "a different request"}, 422)
+                return
+        answer = None
+        try:
+            wait = self.server.host.limiter.take(self.client_address[0])
+            if wait:
+                self._respond_json({"ok": False, "error": "Too many writes, slow down"}, 429,
+                                   {"Retry-After": str(math.ceil(wait))})
+                return
+            self._answer = None
+            try:
+                handler(body)
+            except Overloaded as e:
+                self._respond_json({"ok": False, "error": str(e)}, 503,
+                                   {"Retry-After": str(e.retry_after)})
+                return
+            answer = self._answer
+        finally:
+            if key:
+                idem.finish(key, answer)
+
+    def _run_write(self, args):
+        """site.run() for a write, once the timeline's write queue admits it."""
+        write_queue = self.site.write_queue
+        with write_queue.slot() as admitted:
+            if not admitted:
+                raise Overloaded(write_queue.retry_after())
+            return self.site.run(args)
+
+    def _handle_entries(self, qs):
+        """One day's entries (?date=), or several days (?dates=a,b or
+        ?from=&to=) as [{"date", "entries"}, ...] oldest first, or as one
+        such object per line with format=ndjson. Only days the manifest
+        lists are read."""
+        watcher = self.site.watcher
+        date = qs.get("date", [""])[0]
+        wanted = {d for v in qs.get("dates", []) for d in v.split(",") if d}
+        lo, hi = qs.get("from", [""])[0], qs.get("to", [""])[0]
+        if not (date or wanted or lo or hi):
+            self._respond_json({"error": "date, dates or from/to parameter required"}, 400)
+            return
+        bad = [d for d in wanted | {date, lo, hi} if d and not DATE.match(d)]
+        if bad:
+            self._respond_json({"error": f"dates must be YYYY-MM-DD, got {bad[0]!r}"}, 400)
+            return
+        if date:
+            listed = any(m["date"] == date for m in watcher.manifest())
+            self._respond_bytes(watcher.entries_json(date) if listed else b"[]", "application/json")
+            return
+        listed = sorted(m["date"] for m in watcher.manifest() if m.get("count", 1))
+        if wanted:
+            dates = [d for d in listed if d in wanted]
+        else:
+            dates = [d for d in listed if (not lo or d >= lo) and (not hi or d <= hi)]
+        if len(dates) > MAX_RANGE_DAYS:
+            self._respond_json({"error": f"{len(dates)} days requested; at most {MAX_RANGE_DAYS} "
+                                         f"per request"}, 400)
+            return
+
+        def days_json():
+            for d in dates:
+                yield b'{"date": "%s", "entries": %s}' % (d.encode(), watcher.entries_json(d))
+
+        if qs.get("format", [""])[0] == "ndjson" or "application/x-ndjson" in self.headers.get("Accept", ""):
+            # Streamed a day at a time, so a long range never sits in memory
+            self._start_stream("application/x-ndjson")
+            for line in days_json():
+                self._write_chunk(line + b"\n")
+            self._end_stream()
+        else:
+            self._respond_bytes(b"[" + b", ".join(days_json()) + b"]", "application/json")
+
+    def _handle_search(self, qs):
+        """Entries matching q (a literal, case-insensitive substring) and the
+        --list filters, newest first; answered by the timeline's backend."""
+        args = ["--list", "--json", "--limit", qs.get("limit", ["50"])[0]]
+        if qs.get("q", [""])[0]:
+            args += ["--grep", re.escape(qs["q"][0]).replace("\\ ", " ")]
+        for key in ("since", "until", "mood", "type"):
+            if qs.get(key, [""])[0]:
+                args += [f"--{key}", qs[key][0]]
+        for tag in qs.get("tag", []):
+            args += ["--tag", tag]
+        ok, stdout, stderr = self.site.run(args)
+        if not ok:
+            self._respond_json({"ok": False, "error": stderr.strip() or "Search failed"}, 400)
+            return
+        self._respond_json({"ok": True, "entries": [json.loads(l) for l in stdout.splitlines() if l]})
 
     def _handle_post(self, body):
         content = body.get("content", "").strip()
@@ -703,13 +1775,21 @@ class WhatsUpHandler(http.server.SimpleHTTPRequestHandler):
         for tag in body.get("tags", []):
             if tag:
                 args.extend(["--tag", tag])
+        att = body.get("attachment") or {}
+        if att:
+            url = att.get("url", "")
+            root = self.site.root
+            if att.get("type") not in ("pdf", "image") or not attachments.is_asset_url(url, root):
+                self._respond_json({"ok": False, "error": "Unknown attachment; upload it first"})
+                return
+            args.extend(["--" + att["type"], str(root / url)])
+            if att.get("name"):
+                args.extend(["--file-name", att["name"]])
         args.append(content)
 
-        ok, stdout, stderr = run_cli(args)
-        if ok:
-            self._respond_json({"ok": True, "message": stdout.strip()})
-        else:
-            self._respond_json({"ok": False, "error": stderr.strip() or stdout.strip()})
+        ok, stdout, stderr = self._run_write(args)
+        match = re.search(r"Created entry (\w+)", stdout)
+        self._respond_write(ok, stdout, stderr, match.group(1) if match else None)
 
     def _handle_edit(self, body):
         entry_id = body.get("id", "").strip()
@@ -718,11 +1798,8 @@ class WhatsUpHandler(http.server.SimpleHTTPRequestHandler):
             self._respond_json({"ok": False, "error": "id and content required"})
             return
 
-        ok, stdout, stderr = run_cli(["--edit", entry_id, content])
-        if ok:
-            self._respond_json({"ok": True, "message": stdout.strip()})
-        else:
-            self._respond_json({"ok": False, "error": stderr.strip() or stdout.strip()})
+        ok, stdout, stderr = self._run_write(["--edit", entry_id, content])
+        self._respond_write(ok, stdout, stderr, entry_id)
 
     def _handle_delete(self, body):
         entry_id = body.get("id", "").strip()
@@ -730,30 +1807,199 @@ class WhatsUpHandler(http.server.SimpleHTTPRequestHandler):
             self._respond_json({"ok": False, "error": "id required"})
             return
 
-        ok, stdout, stderr = run_cli(["--delete", entry_id])
+        watcher = self.site.watcher
+        date, _ = watcher.find(entry_id)
+        ok, stdout, stderr = self._run_write(["--delete", entry_id])
+        watcher.check()
         if ok:
-            self._respond_json({"ok": True, "message": stdout.strip()})
+            result = {"ok": True, "message": stdout.strip(), "deleted": entry_id}
+            if date:
+                result.update(date=date, day=watcher.day(date))
+            self._respond_json(result)
         else:
             self._respond_json({"ok": False, "error": stderr.strip() or stdout.strip()})
 
+    def _handle_upload(self):
+        """Stream a multipart file field into the asset store.
+
+        The body is read in UPLOAD_CHUNK pieces and hashed on the way to a
+        temp file, so memory use does not grow with the upload. The result
+        is what /api/post expects as its attachment.
+        """
+        ctype = self.headers.get("Content-Type", "")
+        match = re.search(r'boundary="?([^";]+)"?', ctype)
+        try:
+            length = int(self.headers.get("Content-Length", -1))
+        except ValueError:
+            length = -1
+        if not ctype.startswith("multipart/form-data") or not match:
+            self.close_connection = True
+            self._respond_json({"ok": False, "error": "multipart/form-data required"}, 400)
+            return
+        if length < 0:
+            self.close_connection = True
+            self._respond_json({"ok": False, "error": "Content-Length required"}, 411)
+            return
+        if length > MAX_UPLOAD_BYTES + UPLOAD_CHUNK:
+            self.close_connection = True
+            self._respond_json({"ok": False, "error": "File too large"}, 413)
+            return
+
+        reader = MultipartReader(self.rfile, length, match.group(1).encode("latin-1"))
+        stored = None
+        try:
+            for headers, body in reader.parts():
+                disp = _disposition(headers)
+                if stored is not None or disp.get("name") != "file" or not disp.get("filename"):
+                    continue
+                name = os.path.basename(disp["filename"])
+                ext = Path(name).suffix.lower()
+                if ext not in UPLOAD_TYPES:
+                    self.close_connection = True
+                    self._respond_json({"ok": False, "error": f"Unsupported file type: {ext or name}"}, 415)
+                    return
+                stored = attachments.store_chunks(body, ext, self.site.root, MAX_UPLOAD_BYTES)
+                stored.update(type=UPLOAD_TYPES[ext], name=name)
+        except attachments.TooLarge:
+            self.close_connection = True
+            self._respond_json({"ok": False, "error": "File too large"}, 413)
+            return
+        except (ValueError, OSError) as e:
+            self.close_connection = True
+            self._respond_json({"ok": False, "error": f"Upload failed: {e}"}, 400)
+            return
+        reader.drain()
+
+        if stored is None:
+            self._respond_json({"ok": False, "error": "file field required"}, 400)
+        else:
+            self._respond_json(dict(stored, ok=True))
+
+    def _respond_write(self, ok, stdout, stderr, entry_id):
+        """Answer a post/edit with the stored entry and its day's manifest
+        record, so the page can patch its state without refetching."""
+        watcher = self.site.watcher
+        watcher.check()
+        if not ok:
+            self._respond_json({"ok": False, "error": stderr.strip() or stdout.strip()})
+            return
+        result = {"ok": True, "message": stdout.strip()}
+        date, entry = watcher.find(entry_id) if entry_id else (None, None)
+        if entry is not None:
+            result.update(date=date, entry=entry, day=watcher.day(date))
+        self._respond_json(result)
+
+    # ── Event stream ──
+
+    def _stream_events(self):
+        """Server-sent events: one long-lived response per connected page."""
+        try:
+            last_id = int(self.headers.get("Last-Event-ID", ""))
+        except ValueError:
+            last_id = None
+        hub = self.site.hub
+        sub, replay = hub.subscribe(last_id)
+
+        # The stream runs until the client leaves, so it ends the connection
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            if replay is None:
+                self._write_event(None, "reset", {})
+            for event in replay or []:
+                self._write_event(*event)
+            self.wfile.flush()
+            while not sub.dropped:
+                try:
+                    event = sub.queue.get(timeout=HEARTBEAT)
+                except queue.Empty:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    self._write_event(*event)
+                self.wfile.flush()
+            # Fell too far behind: have the page refetch
+            self._write_event(None, "reset", {})
+            self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            hub.unsubscribe(sub)
+            self.close_connection = True
+
+    def _write_event(self, seq, kind, data):
+        msg = f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+        if seq is not None:
+            msg = f"id: {seq}\n" + msg
+        self.wfile.write(msg.encode("utf-8"))
+
     # ── Response helpers ──
 
+    @staticmethod
+    def _timeline_index(names):
+        items = "".join(f'<li><a href="t/{urllib.parse.quote(n)}/">{n}</a></li>' for n in names)
+        return ('<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">'
+                '<title>WhatsUp timelines</title></head><body>'
+                f'<h1>Timelines</h1><ul>{items or "<li>None yet</li>"}</ul></body></html>')
+
     def _respond_html(self, html):
         data = html.encode("utf-8")
         self.send_response(200)
         self.send_header("Content-Type", "text/html; charset=utf-8")
         self.send_header("Content-Length", str(len(data)))
         self.end_headers()
-        self.wfile.write(data)
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _respond_bytes(self, data, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _start_stream(self, content_type):
+        """Begin a response of unknown length: chunked on HTTP/1.1, else
+        delimited by closing the connection."""
+        self._chunked = self.request_version == "HTTP/1.1" and self.protocol_version == "HTTP/1.1"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+        if self._chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        if not data:
+            return
+        if self._chunked:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        else:
+            self.wfile.write(data)
+
+    def _end_stream(self):
+        if self._chunked:
+            self.wfile.write(b"0\r\n\r\n")
 
-    def _respond_json(self, obj, status=200):
+    def _respond_json(self, obj, status=200, headers=None):
+        self._answer = (status, obj)
         data = json.dumps(obj).encode("utf-8")
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.send_header("Content-Length", str(len(data)))
         self.end_headers()
-        self.wfile.write(data)
+        if self.command != "HEAD":
+            self.wfile.write(data)
 
     def _serve_json_file(self, path):
         if path.exists():
@@ -769,9 +2015,27 @@ class WhatsUpHandler(http.server.SimpleHTTPRequestHandler):
 # ── Main ──────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
-    server = HTTPServer(("", PORT), WhatsUpHandler)
-    print(f"WhatsUp Web GUI: http://localhost:{PORT}")
-    webbrowser.open(f"http://localhost:{PORT}")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WhatsUp web GUI")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--timelines", metavar="DIR",
+                        help="serve every timeline under DIR at /t/<name>/ instead of this checkout")
+    parser.add_argument("--max-open", type=int, default=MAX_OPEN_TIMELINES,
+                        help="hosted timelines kept loaded at once")
+    parser.add_argument("--write-queue", type=int, default=WRITE_QUEUE,
+                        help="writes admitted per timeline at once; more get a 503")
+    parser.add_argument("--write-rate", type=float, default=WRITE_RATE,
+                        help="writes per second allowed per client; more get a 429 (0: no limit)")
+    opts = parser.parse_args()
+
+    server = ThreadingHTTPServer(("", opts.port), WhatsUpHandler)
+    server.daemon_threads = True
+    server.host = TimelineHost(opts.timelines, max(1, opts.max_open),
+                               write_queue=max(1, opts.write_queue), write_rate=opts.write_rate)
+    server.host.start()
+    print(f"WhatsUp Web GUI: http://localhost:{opts.port}")
+    webbrowser.open(f"http://localhost:{opts.port}")
     try:
         server.serve_forever()
     except KeyboardInterrupt: